@@ -1,18 +1,130 @@
-from django.contrib import admin
-from .models import Cliente, Agenda, Painel
+import hashlib
+
+from django.contrib import admin, messages
+from django.core.cache import cache
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils.functional import cached_property
+from .importacao import ErroImportacao, importar
+from .models import AssinaturaContrato, Cliente, Agenda, Pacote, Painel
+
+# Abaixo disso o COUNT(*) é barato e a contagem exata vale a pena
+LIMITE_CONTAGEM_EXATA = 10000
+CONTAGEM_TIMEOUT = 60
+
+
+class ContagemEstimadaPaginator(Paginator):
+    """
+    Paginador do admin para tabelas grandes. Sem filtros, usa a estimativa de
+    linhas do Postgres (pg_class.reltuples) em vez de COUNT(*); com filtros
+    ou busca, a contagem exata fica em cache por CONTAGEM_TIMEOUT segundos.
+    """
+
+    @cached_property
+    def count(self):
+        consulta = self.object_list
+        if not consulta.query.where:
+            estimativa = self._estimativa(consulta)
+            if estimativa is not None and estimativa > LIMITE_CONTAGEM_EXATA:
+                return estimativa
+        chave = 'admin:contagem:' + hashlib.md5(str(consulta.query).encode('utf-8')).hexdigest()
+        return cache.get_or_set(chave, consulta.count, CONTAGEM_TIMEOUT)
+
+    @staticmethod
+    def _estimativa(consulta):
+        conexao = connections[consulta.db]
+        if conexao.vendor != 'postgresql':
+            return None
+        with conexao.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                [consulta.model._meta.db_table],
+            )
+            linha = cursor.fetchone()
+        # -1 (ou 0) enquanto a tabela nunca passou por ANALYZE
+        return linha[0] if linha and linha[0] > 0 else None
+
+
+class TabelaGrandeAdmin(admin.ModelAdmin):
+    paginator = ContagemEstimadaPaginator
+    # O "x de y no total" ao lado da busca faria um COUNT(*) sem filtros
+    show_full_result_count = False
+
 
 @admin.register(Cliente)
-class ClienteAdmin(admin.ModelAdmin):
+class ClienteAdmin(TabelaGrandeAdmin):
     list_display = ('nome', 'telefone','area')
+    # icontains atendido pelos índices de trigramas (migração 0014, Postgres)
     search_fields = ('nome', 'telefone','area')
 
 @admin.register(Agenda)
-class AgendaAdmin(admin.ModelAdmin):
+class AgendaAdmin(TabelaGrandeAdmin):
     list_display = ('cliente', 'data', 'horario', 'tipo_pacote', 'forma_pagamento', 'valor')
     list_filter = ('data', 'tipo_pacote', 'forma_pagamento')
+    date_hierarchy = 'data'
     search_fields = ('cliente__nome',)  # 'telefone' removido pois não existe maiss
+    list_select_related = ('cliente',)  # __str__ e a coluna cliente usam o nome
+    # Um <select> com todos os clientes não cabe na página com milhões de linhas
+    raw_id_fields = ('cliente', 'pacote')
+
+    def get_urls(self):
+        return [
+            path('importar/', self.admin_site.admin_view(self.importar_view),
+                 name='aplicativo_agenda_importar'),
+        ] + super().get_urls()
+
+    def importar_view(self, request):
+        if not self.has_add_permission(request):
+            raise PermissionDenied
+
+        if request.method == 'POST' and request.FILES.get('arquivo'):
+            arquivo = request.FILES['arquivo']
+            try:
+                resultado = importar(arquivo, arquivo.name)
+            except ErroImportacao as e:
+                self.message_user(request, str(e), messages.ERROR)
+            else:
+                self.message_user(request, (
+                    f"{resultado['agendas']} agenda(s) importada(s), "
+                    f"{resultado['clientes_novos']} cliente(s) novo(s) e "
+                    f"{resultado['clientes_atualizados']} atualizado(s) em "
+                    f"{resultado['segundos']:.1f}s ({resultado['linhas_por_segundo']:.0f} linhas/s)."
+                ), messages.SUCCESS)
+                for numero, mensagem in resultado['erros']:
+                    self.message_user(request, f"Linha {numero} ignorada: {mensagem}", messages.WARNING)
+                for numero, mensagem in resultado['avisos']:
+                    self.message_user(request, f"Linha {numero}: {mensagem}", messages.WARNING)
+                return redirect('admin:aplicativo_agenda_changelist')
+
+        return TemplateResponse(request, 'admin/aplicativo/agenda/importar.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Importar agendas',
+        })
 
 @admin.register(Painel)
-class PainelAdmin(admin.ModelAdmin):
+class PainelAdmin(TabelaGrandeAdmin):
     list_display = ('agenda', 'presenca')
     list_filter = ('presenca',)
+    date_hierarchy = 'agenda__data'
+    list_select_related = ('agenda__cliente',)  # Painel.__str__ -> Agenda.__str__ -> cliente.nome
+    raw_id_fields = ('agenda',)
+
+@admin.register(AssinaturaContrato)
+class AssinaturaContratoAdmin(admin.ModelAdmin):
+    list_display = ('cliente', 'assinado_em', 'link', 'nonce')
+    list_select_related = ('cliente',)
+    search_fields = ('cliente__nome',)
+    raw_id_fields = ('cliente', 'link')
+    readonly_fields = ('imagem', 'imagem_sha256', 'contrato', 'contrato_sha256')
+
+@admin.register(Pacote)
+class PacoteAdmin(admin.ModelAdmin):
+    list_display = ('cliente', 'descricao', 'sessoes_usadas', 'sessoes_agendadas', 'total_sessoes', 'valor', 'criado_em')
+    list_select_related = ('cliente',)
+    search_fields = ('cliente__nome', 'descricao')
+    raw_id_fields = ('cliente',)
@@ -0,0 +1,189 @@
+"""
+Gravação das assinaturas de contrato.
+
+O canvas da página de assinatura envia um data URL PNG em base64 (centenas
+de KB). Aqui ele é decodificado, reduzido a um PNG de 1 bit recortado em
+volta do traço (poucos KB) e gravado no storage junto com o PDF do contrato
+já com a assinatura; a linha guarda os caminhos e o SHA-256 dos arquivos.
+Cada link aceita uma assinatura só; o cliente baixa o contrato por um token
+aleatório guardado na linha.
+"""
+import base64
+import binascii
+import hashlib
+import io
+import secrets
+
+from django.core.files.base import ContentFile
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.html import escape
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import cm
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer
+
+from .models import AssinaturaContrato
+
+PREFIXO_DATA_URL = 'data:image/png;base64,'
+# Limites do que o canvas (400x200) pode mandar, com folga
+MAX_BYTES = 2 * 1024 * 1024
+MAX_LADO = 2000
+MARGEM_TRACO = 8
+LIMIAR_TINTA = 160
+
+TEXTO_CONTRATO = [
+    "Pelo presente instrumento, o(a) cliente abaixo identificado(a) contrata os "
+    "serviços de estética descritos no agendamento, declarando ter recebido as "
+    "orientações sobre o procedimento, seus cuidados e contraindicações.",
+    "O(a) cliente autoriza a realização do procedimento na área indicada e se "
+    "compromete a seguir as recomendações pós-procedimento.",
+]
+
+
+class AssinaturaInvalida(Exception):
+    pass
+
+
+class ContratoJaAssinado(Exception):
+    def __init__(self, assinatura):
+        super().__init__("Este contrato já foi assinado.")
+        self.assinatura = assinatura
+
+
+def decodificar(data_url):
+    """Bytes do PNG enviado pelo canvas."""
+    if not data_url or not data_url.startswith(PREFIXO_DATA_URL):
+        raise AssinaturaInvalida("Assinatura ausente.")
+    codificado = data_url[len(PREFIXO_DATA_URL):]
+    if len(codificado) > MAX_BYTES * 4 // 3:
+        raise AssinaturaInvalida("Imagem da assinatura grande demais.")
+    try:
+        return base64.b64decode(codificado, validate=True)
+    except (binascii.Error, ValueError):
+        raise AssinaturaInvalida("Imagem da assinatura corrompida.")
+
+
+def compactar(png):
+    """PNG de 1 bit, fundo branco, recortado em volta do traço."""
+    from PIL import Image as ImagemPIL, UnidentifiedImageError
+
+    try:
+        imagem = ImagemPIL.open(io.BytesIO(png))
+        if imagem.format != 'PNG' or max(imagem.size) > MAX_LADO:
+            raise AssinaturaInvalida("Imagem da assinatura inválida.")
+        imagem = imagem.convert('RGBA')
+    except (UnidentifiedImageError, OSError):
+        raise AssinaturaInvalida("Imagem da assinatura inválida.")
+
+    # O canvas é transparente: aplica sobre fundo branco antes de binarizar
+    fundo = ImagemPIL.new('RGBA', imagem.size, 'white')
+    cinza = ImagemPIL.alpha_composite(fundo, imagem).convert('L')
+    tinta = cinza.point(lambda valor: 255 if valor < LIMIAR_TINTA else 0)
+    caixa = tinta.getbbox()
+    if caixa is None:
+        raise AssinaturaInvalida("A assinatura está em branco.")
+
+    esquerda, topo, direita, base = caixa
+    caixa = (
+        max(esquerda - MARGEM_TRACO, 0), max(topo - MARGEM_TRACO, 0),
+        min(direita + MARGEM_TRACO, cinza.width), min(base + MARGEM_TRACO, cinza.height),
+    )
+    binaria = cinza.crop(caixa).point(lambda valor: 0 if valor < LIMIAR_TINTA else 255).convert('1')
+
+    saida = io.BytesIO()
+    binaria.save(saida, format='PNG', optimize=True)
+    return saida.getvalue()
+
+
+def gerar_contrato_pdf(cliente, imagem_png, assinado_em):
+    """PDF do contrato com os dados do cliente e a imagem da assinatura."""
+    estilos = getSampleStyleSheet()
+    saida = io.BytesIO()
+    documento = SimpleDocTemplate(
+        saida, pagesize=A4, leftMargin=2 * cm, rightMargin=2 * cm,
+        topMargin=2 * cm, bottomMargin=2 * cm, title="Contrato",
+    )
+
+    assinatura = Image(io.BytesIO(imagem_png))
+    # Mantém a proporção com no máximo 7 x 3 cm
+    escala = min(7 * cm / assinatura.imageWidth, 3 * cm / assinatura.imageHeight, 1)
+    assinatura.drawWidth = assinatura.imageWidth * escala
+    assinatura.drawHeight = assinatura.imageHeight * escala
+
+    conteudo = [
+        Paragraph("Contrato de Prestação de Serviços", estilos['Title']),
+        Spacer(1, 0.5 * cm),
+        Paragraph(f"<b>Cliente:</b> {escape(cliente.nome)}", estilos['Normal']),
+        Paragraph(f"<b>Telefone:</b> {escape(cliente.telefone)}", estilos['Normal']),
+        Paragraph(f"<b>Área do procedimento:</b> {escape(cliente.area)}", estilos['Normal']),
+        Spacer(1, 0.5 * cm),
+    ]
+    for paragrafo in TEXTO_CONTRATO:
+        conteudo += [Paragraph(paragrafo, estilos['BodyText']), Spacer(1, 0.3 * cm)]
+    local = timezone.localtime(assinado_em)
+    conteudo += [
+        Spacer(1, 1 * cm),
+        assinatura,
+        Paragraph("_" * 45, estilos['Normal']),
+        Paragraph(f"{escape(cliente.nome)} — assinado em {local:%d/%m/%Y às %H:%M}", estilos['Normal']),
+    ]
+    documento.build(conteudo)
+    return saida.getvalue()
+
+
+def assinatura_do_link(link=None, nonce=''):
+    """Assinatura já feita com o link salvo ou com o nonce do link assinado."""
+    if link is not None:
+        filtro = {'link': link}
+    elif nonce:
+        filtro = {'nonce': nonce}
+    else:
+        return None
+    return AssinaturaContrato.objects.filter(**filtro).first()
+
+
+def _guardar(assinatura, campo, nome, conteudo):
+    getattr(assinatura, campo).save(nome, ContentFile(conteudo), save=False)
+    setattr(assinatura, f'{campo}_sha256', hashlib.sha256(conteudo).hexdigest())
+
+
+def _apagar_arquivos(assinatura):
+    for arquivo in (assinatura.imagem, assinatura.contrato):
+        if arquivo:
+            arquivo.delete(save=False)
+
+
+def registrar(cliente, data_url, link=None, nonce='', ip=None):
+    """
+    Valida, compacta e grava a assinatura e o contrato em PDF. Levanta
+    ContratoJaAssinado se o link já tiver sido usado.
+    """
+    existente = assinatura_do_link(link, nonce)
+    if existente is not None:
+        raise ContratoJaAssinado(existente)
+
+    imagem = compactar(decodificar(data_url))
+    assinatura = AssinaturaContrato(
+        cliente=cliente, link=link, nonce=nonce, ip=ip, token=secrets.token_urlsafe(32),
+    )
+    contrato = gerar_contrato_pdf(cliente, imagem, assinatura.assinado_em)
+    _guardar(assinatura, 'imagem', f'cliente_{cliente.pk}.png', imagem)
+    _guardar(assinatura, 'contrato', f'contrato_cliente_{cliente.pk}.pdf', contrato)
+    try:
+        with transaction.atomic():
+            assinatura.save()
+    except Exception as e:
+        _apagar_arquivos(assinatura)
+        if not isinstance(e, IntegrityError):
+            raise
+        # Dois envios simultâneos do mesmo link: vale o primeiro
+        existente = assinatura_do_link(link, nonce)
+        if existente is None:
+            raise
+        raise ContratoJaAssinado(existente)
+    return assinatura
+
+
+def assinatura_do_token(token):
+    return AssinaturaContrato.objects.select_related('cliente').filter(token=token).first()
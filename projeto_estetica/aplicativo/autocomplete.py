@@ -0,0 +1,180 @@
+import hashlib
+import unicodedata
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+CHAVE_VERSAO = 'autocomplete:versao'
+LIMITE_PADRAO = 10
+LIMITE_OPCOES = 20
+# Muda junto com o formato das linhas guardadas em cache
+FORMATO = 3
+
+
+def normalizar_nome(texto):
+    """Remove acentos, espaços repetidos e caixa: 'João  Silva' -> 'joao silva'."""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', texto)
+    sem_acento = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acento.casefold().split())
+
+
+def _timeout():
+    return getattr(settings, 'AUTOCOMPLETE_CACHE_TIMEOUT', 300)
+
+
+def _versao():
+    versao = cache.get(CHAVE_VERSAO)
+    if versao is None:
+        versao = 1
+        cache.add(CHAVE_VERSAO, versao, None)
+    return versao
+
+
+async def _aversao():
+    versao = await cache.aget(CHAVE_VERSAO)
+    if versao is None:
+        versao = 1
+        await cache.aadd(CHAVE_VERSAO, versao, None)
+    return versao
+
+
+def _chave(versao, limite, prefixo):
+    digest = hashlib.md5(prefixo.encode('utf-8')).hexdigest()
+    return f'autocomplete:{FORMATO}:{versao}:{limite}:{digest}'
+
+
+def invalidar_cache():
+    """Descarta todos os resultados em cache trocando a versão das chaves."""
+    try:
+        cache.incr(CHAVE_VERSAO)
+    except ValueError:
+        cache.set(CHAVE_VERSAO, 2, None)
+
+
+def _consulta(prefixo, limite):
+    from .models import Cliente
+    from .pacotes import anotar_saldo
+
+    # values_list evita instanciar o model; o filtro usa o índice de prefixo.
+    # O saldo vem da linha do pacote atual (sem somar o histórico de agendas).
+    return (
+        anotar_saldo(Cliente.objects.filter(nome_normalizado__startswith=prefixo))
+        .order_by('nome_normalizado', 'id')
+        .values_list('nome_normalizado', 'nome', 'telefone', 'area', 'pacote_total', 'pacote_restantes')[:limite]
+    )
+
+
+def _do_prefixo_menor(encontrados, prefixo, limite):
+    """Filtra um prefixo menor em cache que trouxe todas as respostas possíveis."""
+    completo = next((r for r in encontrados.values() if len(r) < limite), None)
+    if completo is None:
+        return None
+    return [linha for linha in completo if linha[0].startswith(prefixo)]
+
+
+def _formatar(linhas):
+    from .pacotes import descrever_saldo
+
+    return [
+        {
+            'label': nome, 'value': nome, 'telefone': telefone, 'area': area,
+            'pacote': descrever_saldo(total, restantes),
+        }
+        for _, nome, telefone, area, total, restantes in linhas
+    ]
+
+
+def buscar_clientes(termo, limite=LIMITE_PADRAO):
+    """
+    Retorna até `limite` clientes cujo nome começa com `termo`, ignorando
+    acentos e maiúsculas. Os resultados ficam em cache por prefixo
+    normalizado; se um prefixo menor já em cache trouxe menos de `limite`
+    linhas, ele contém todas as respostas possíveis e é filtrado em memória
+    sem ir ao banco (caso típico de quem continua digitando).
+    """
+    prefixo = normalizar_nome(termo)
+    versao = _versao()
+    chave = _chave(versao, limite, prefixo)
+
+    linhas = cache.get(chave)
+    if linhas is None:
+        menores = [_chave(versao, limite, prefixo[:i]) for i in range(len(prefixo))]
+        linhas = _do_prefixo_menor(cache.get_many(menores) if menores else {}, prefixo, limite)
+        if linhas is None:
+            linhas = list(_consulta(prefixo, limite))
+        cache.set(chave, linhas, _timeout())
+    return _formatar(linhas)
+
+
+async def abuscar_clientes(termo, limite=LIMITE_PADRAO):
+    """buscar_clientes para views assíncronas (mesmas chaves de cache)."""
+    prefixo = normalizar_nome(termo)
+    versao = await _aversao()
+    chave = _chave(versao, limite, prefixo)
+
+    linhas = await cache.aget(chave)
+    if linhas is None:
+        menores = [_chave(versao, limite, prefixo[:i]) for i in range(len(prefixo))]
+        linhas = _do_prefixo_menor(await cache.aget_many(menores) if menores else {}, prefixo, limite)
+        if linhas is None:
+            linhas = [linha async for linha in _consulta(prefixo, limite)]
+        await cache.aset(chave, linhas, _timeout())
+    return _formatar(linhas)
+
+
+def _chave_opcoes(versao, prefixo, pagina, por_pagina):
+    digest = hashlib.md5(prefixo.encode('utf-8')).hexdigest()
+    return f'opcoes_clientes:{versao}:{por_pagina}:{pagina}:{digest}'
+
+
+def _consulta_opcoes(prefixo, pagina, por_pagina):
+    from .models import Cliente
+
+    inicio = (pagina - 1) * por_pagina
+    # Uma linha a mais só para saber se existe próxima página
+    return (
+        Cliente.objects
+        .filter(nome_normalizado__startswith=prefixo)
+        .order_by('nome_normalizado', 'id')
+        .values_list('id', 'nome')[inicio:inicio + por_pagina + 1]
+    )
+
+
+def _pagina_opcoes(linhas, por_pagina):
+    return {
+        'resultados': [{'id': id, 'nome': nome} for id, nome in linhas[:por_pagina]],
+        'mais': len(linhas) > por_pagina,
+    }
+
+
+def opcoes_clientes(termo='', pagina=1, por_pagina=LIMITE_OPCOES):
+    """
+    Página de clientes (id e nome) cujo nome começa com `termo`, para os
+    campos de escolha de cliente. Fica em cache com a mesma versão do
+    autocomplete, então some quando algum cliente muda.
+    """
+    prefixo = normalizar_nome(termo)
+    chave = _chave_opcoes(_versao(), prefixo, pagina, por_pagina)
+
+    pagina_cache = cache.get(chave)
+    if pagina_cache is None:
+        linhas = list(_consulta_opcoes(prefixo, pagina, por_pagina))
+        pagina_cache = _pagina_opcoes(linhas, por_pagina)
+        cache.set(chave, pagina_cache, _timeout())
+    return pagina_cache
+
+
+async def aopcoes_clientes(termo='', pagina=1, por_pagina=LIMITE_OPCOES):
+    """opcoes_clientes para views assíncronas (mesmas chaves de cache)."""
+    prefixo = normalizar_nome(termo)
+    chave = _chave_opcoes(await _aversao(), prefixo, pagina, por_pagina)
+
+    pagina_cache = await cache.aget(chave)
+    if pagina_cache is None:
+        linhas = [linha async for linha in _consulta_opcoes(prefixo, pagina, por_pagina)]
+        pagina_cache = _pagina_opcoes(linhas, por_pagina)
+        await cache.aset(chave, pagina_cache, _timeout())
+    return pagina_cache
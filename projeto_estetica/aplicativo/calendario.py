@@ -0,0 +1,61 @@
+"""
+Agendas de um intervalo de datas (semana/mês) num JSON compacto.
+
+Uma única consulta com values_list, ordenada por (data, horario) para usar o
+índice agenda_data_horario, agrupada por dia aqui. O corpo pronto fica em
+cache pelo ETag do período (versões dos dias e dos clientes), então um
+período sem mudanças nem chega a consultar o banco.
+"""
+import json
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+
+from . import versoes
+from .models import Agenda
+
+CAMPOS = (
+    'data', 'id', 'horario', 'cliente_id', 'cliente__nome', 'cliente__telefone',
+    'tipo_pacote', 'quantidade_pacote', 'forma_pagamento', 'valor', 'painel__presenca',
+    'duracao', 'profissional', 'sala',
+)
+CHAVES = (
+    'id', 'horario', 'cliente_id', 'nome', 'telefone',
+    'tipo_pacote', 'quantidade_pacote', 'forma_pagamento', 'valor', 'presenca',
+    'duracao', 'profissional', 'sala',
+)
+TIMEOUT = 10 * 60
+
+
+def etag_calendario(inicio, fim):
+    return versoes.etag_periodo('calendario', inicio, fim)
+
+
+def agendas_por_dia(inicio, fim):
+    """{'2025-01-06': [agenda, ...], ...} só com os dias que têm agendas."""
+    linhas = (
+        Agenda.objects
+        .filter(data__range=(inicio, fim))
+        .order_by('data', 'horario', 'id')
+        .values_list(*CAMPOS)
+    )
+    dias = {}
+    for data, *valores in linhas:
+        agenda = dict(zip(CHAVES, valores))
+        agenda['horario'] = agenda['horario'].strftime('%H:%M')
+        agenda['presenca'] = bool(agenda['presenca'])
+        dias.setdefault(data.isoformat(), []).append(agenda)
+    return dias
+
+
+def calendario_json(inicio, fim, etag):
+    """Corpo JSON do período, reaproveitado do cache enquanto o ETag valer."""
+    chave = f'calendario:{etag}'
+    corpo = cache.get(chave)
+    if corpo is None:
+        corpo = json.dumps(
+            {'inicio': inicio, 'fim': fim, 'dias': agendas_por_dia(inicio, fim)},
+            cls=DjangoJSONEncoder, separators=(',', ':'),
+        )
+        cache.set(chave, corpo, TIMEOUT)
+    return corpo
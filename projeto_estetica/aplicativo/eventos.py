@@ -0,0 +1,138 @@
+"""
+Avisos em tempo real de mudanças no painel (Server-Sent Events).
+
+Toda gravação de Agenda/Painel passa por signals.dias_alterados, que chama
+publicar() com os dias afetados. No Postgres o aviso é um NOTIFY na própria
+transação (só sai no commit, e some num rollback); cada processo mantém uma
+thread com LISTEN numa conexão própria e repassa os avisos às telas abertas
+naquele processo. Nos outros bancos (SQLite no desenvolvimento) o aviso é
+entregue direto, depois do commit, apenas às telas do mesmo processo.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from contextlib import asynccontextmanager
+
+from django.conf import settings
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+CANAL = 'painel_eventos'
+# O payload do NOTIFY tem limite de 8000 bytes
+DIAS_POR_AVISO = 200
+# Porta do pooler em modo transação (DB_PORT do deploy no Supabase): o LISTEN
+# é aceito, mas as notificações nunca chegam
+PORTA_POOLER_TRANSACAO = '6543'
+
+_assinantes = set()
+_trava = threading.Lock()
+_ouvinte = None
+_sem_listen = False
+
+
+def publicar(dias):
+    """Avisa as telas que os dias mudaram (no commit da transação atual)."""
+    dias = sorted(str(dia) for dia in dias)
+    for inicio in range(0, len(dias), DIAS_POR_AVISO):
+        evento = {'dias': dias[inicio:inicio + DIAS_POR_AVISO]}
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT pg_notify(%s, %s)', [CANAL, json.dumps(evento)])
+        else:
+            transaction.on_commit(lambda evento=evento: _distribuir(evento))
+
+
+def _distribuir(evento):
+    with _trava:
+        assinantes = list(_assinantes)
+    for loop, fila, dia in assinantes:
+        if dia in evento['dias']:
+            loop.call_soon_threadsafe(fila.put_nowait, evento)
+
+
+@asynccontextmanager
+async def assinar(dia):
+    """Fila (asyncio.Queue) que recebe os avisos do dia enquanto o bloco durar."""
+    _iniciar_ouvinte()
+    assinante = (asyncio.get_running_loop(), asyncio.Queue(), str(dia))
+    with _trava:
+        _assinantes.add(assinante)
+    try:
+        yield assinante[1]
+    finally:
+        with _trava:
+            _assinantes.discard(assinante)
+
+
+def _iniciar_ouvinte():
+    global _ouvinte, _sem_listen
+    if connection.vendor != 'postgresql':
+        return
+    with _trava:
+        if _sem_listen:
+            return
+        if _parametros_conexao() is None:
+            _sem_listen = True
+            logger.error(
+                "DB_PORT=%s é o pooler em modo transação, que não entrega NOTIFY: "
+                "o painel fica sem atualização em tempo real. Defina EVENTOS_DB_URL "
+                "(conexão direta) ou EVENTOS_DB_PORT (pooler em modo sessão).",
+                settings.DATABASES['default']['PORT'],
+            )
+            return
+        if _ouvinte is None or not _ouvinte.is_alive():
+            _ouvinte = threading.Thread(target=_escutar, name='painel-eventos', daemon=True)
+            _ouvinte.start()
+
+
+def _parametros_conexao():
+    """
+    Conexão própria para o LISTEN: EVENTOS_DB_URL, ou a do banco padrão com
+    EVENTOS_DB_PORT. None se só houver o pooler em modo transação.
+    """
+    if settings.EVENTOS_DB_URL:
+        return {'dsn': settings.EVENTOS_DB_URL}
+    banco = settings.DATABASES['default']
+    porta = settings.EVENTOS_DB_PORT or str(banco['PORT'])
+    if porta == PORTA_POOLER_TRANSACAO and not settings.EVENTOS_DB_PORT:
+        return None
+    parametros = {
+        'dbname': banco['NAME'],
+        'user': banco['USER'],
+        'password': banco['PASSWORD'],
+        'host': banco['HOST'],
+        'port': porta,
+    }
+    for opcao in ('sslmode', 'connect_timeout'):
+        if opcao in banco['OPTIONS']:
+            parametros[opcao] = banco['OPTIONS'][opcao]
+    return parametros
+
+
+def _escutar():
+    import psycopg2
+    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+    while True:
+        conexao = None
+        try:
+            conexao = psycopg2.connect(**_parametros_conexao())
+            conexao.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with conexao.cursor() as cursor:
+                cursor.execute(f'LISTEN {CANAL}')
+            while True:
+                if select.select([conexao], [], [], 60) == ([], [], []):
+                    continue
+                conexao.poll()
+                while conexao.notifies:
+                    _distribuir(json.loads(conexao.notifies.pop(0).payload))
+        except Exception:
+            logger.exception("Ouvinte de eventos do painel caiu; reconectando em 5s")
+            time.sleep(5)
+        finally:
+            if conexao is not None:
+                conexao.close()
@@ -1,4 +1,5 @@
 from django import forms
+from .horarios import conflitos, descrever
 from .models import Agenda, Cliente
 
 
@@ -65,12 +66,33 @@ class AgendaForm(forms.ModelForm):
         label="Forma de Pagamento"
     )
 
+    duracao = forms.IntegerField(
+        required=False,
+        min_value=5,
+        max_value=12 * 60,
+        widget=forms.NumberInput(attrs={'class': 'form-control', 'step': 5}),
+        label="Duração (min)"
+    )
+    profissional = forms.CharField(
+        required=False,
+        max_length=100,
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+        label="Profissional"
+    )
+    sala = forms.CharField(
+        required=False,
+        max_length=50,
+        widget=forms.TextInput(attrs={'class': 'form-control'}),
+        label="Sala"
+    )
+
     class Meta:
         model = Agenda
         fields = [
             'data', 'horario',
             'tipo_pacote', 'quantidade_pacote',
-            'forma_pagamento', 'valor'
+            'forma_pagamento', 'valor',
+            'duracao', 'profissional', 'sala',
         ]
         widgets = {
             'data': forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}),
@@ -78,6 +100,23 @@ class AgendaForm(forms.ModelForm):
             'valor': forms.NumberInput(attrs={'class': 'form-control'}),
         }
 
+    def clean_duracao(self):
+        return self.cleaned_data.get('duracao') or Agenda._meta.get_field('duracao').default
+
+    def clean(self):
+        dados = super().clean()
+        if self.errors or not (dados.get('profissional') or dados.get('sala')):
+            return dados
+        ocupados = conflitos(
+            dados['data'], dados['horario'], dados['duracao'],
+            dados['profissional'], dados['sala'], excluir=self.instance.pk,
+        )
+        if ocupados:
+            raise forms.ValidationError(
+                "Horário em conflito com: %s." % "; ".join(descrever(agenda) for agenda in ocupados)
+            )
+        return dados
+
 class PainelFiltroForm(forms.Form):
     data = forms.DateField(
         required=False,
@@ -91,11 +130,12 @@ class PainelFiltroForm(forms.Form):
     )
 
 class ClienteForm(forms.Form):
-    nome = forms.ChoiceField(
-        choices=[('', 'Selecione um cliente')] + list(
-            Cliente.objects.all()
-            .order_by('nome')
-            .values_list('id', 'nome')
-        ),
+    # Só o id escolhido vai no formulário; a lista de clientes vem da busca
+    # paginada (opcoes_cliente), então nada é consultado ao importar o módulo
+    # e a página não carrega todos os clientes.
+    nome = forms.ModelChoiceField(
+        queryset=Cliente.objects.only('id', 'nome'),
+        widget=forms.HiddenInput(attrs={'id': 'id_cliente'}),
         label="Cliente",
-    )
\ No newline at end of file
+        error_messages={'invalid_choice': "Cliente não encontrado."},
+    )
@@ -0,0 +1,84 @@
+"""
+Histórico e valor do cliente ao longo do tempo.
+
+O resumo (agendamentos, visitas, faltas, receita, primeira/última visita) é
+uma única agregação sobre Agenda ⨝ Painel do cliente. O intervalo médio entre
+visitas não precisa de window function: a soma das diferenças entre visitas
+consecutivas (LAG) é a última menos a primeira, então a média é
+(última - primeira) / (visitas - 1). O histórico é paginado por chave
+(data, horario, id), servido pelo índice agenda_cliente_data.
+"""
+from datetime import date, time
+
+from django.db.models import Count, F, Max, Min, Q, Sum
+
+from .models import Agenda
+
+HISTORICO_POR_PAGINA = 30
+
+PRESENTE = Q(painel__presenca=True)
+
+
+class CursorInvalido(ValueError):
+    pass
+
+
+def resumo_cliente(cliente_id, hoje=None):
+    """Totais do cliente numa consulta; faltas só contam dias já passados."""
+    hoje = hoje or date.today()
+    resumo = Agenda.objects.filter(cliente_id=cliente_id).aggregate(
+        agendamentos=Count('id'),
+        visitas=Count('id', filter=PRESENTE),
+        faltas=Count('id', filter=Q(painel__presenca=False, data__lt=hoje)),
+        receita=Sum('valor', filter=PRESENTE),
+        primeira_visita=Min('data', filter=PRESENTE),
+        ultima_visita=Max('data', filter=PRESENTE),
+        proximo_agendamento=Min('data', filter=Q(data__gte=hoje)),
+    )
+    visitas, faltas = resumo['visitas'], resumo['faltas']
+    resumo['taxa_comparecimento'] = round(visitas / (visitas + faltas), 3) if visitas + faltas else None
+    resumo['intervalo_medio_dias'] = (
+        round((resumo['ultima_visita'] - resumo['primeira_visita']).days / (visitas - 1), 1)
+        if visitas > 1 else None
+    )
+    return resumo
+
+
+def _cursor(linha):
+    return f"{linha['data'].isoformat()}_{linha['horario'].isoformat()}_{linha['id']}"
+
+
+def _ler_cursor(cursor):
+    try:
+        data, horario, pk = cursor.split('_')
+        return date.fromisoformat(data), time.fromisoformat(horario), int(pk)
+    except ValueError:
+        raise CursorInvalido(cursor)
+
+
+def historico_cliente(cliente_id, antes=None, por_pagina=HISTORICO_POR_PAGINA):
+    """
+    Agendamentos do mais recente para o mais antigo. `antes` é o cursor
+    devolvido pela página anterior. Retorna (linhas, cursor da próxima página
+    ou None).
+    """
+    consulta = (
+        Agenda.objects
+        .filter(cliente_id=cliente_id)
+        .order_by('-data', '-horario', '-id')
+        .values(
+            'id', 'data', 'horario', 'duracao', 'tipo_pacote', 'forma_pagamento',
+            'valor', 'profissional', presenca=F('painel__presenca'),
+        )
+    )
+    if antes:
+        data, horario, pk = _ler_cursor(antes)
+        consulta = consulta.filter(
+            Q(data__lt=data)
+            | Q(data=data, horario__lt=horario)
+            | Q(data=data, horario=horario, id__lt=pk)
+        )
+
+    linhas = list(consulta[:por_pagina + 1])
+    proxima = _cursor(linhas[por_pagina - 1]) if len(linhas) > por_pagina else None
+    return linhas[:por_pagina], proxima
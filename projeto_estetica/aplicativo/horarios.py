@@ -0,0 +1,129 @@
+"""
+Conflitos de horário e busca de horários livres.
+
+Um agendamento ocupa [horario, horario + duracao) no seu dia. Dois
+agendamentos conflitam quando se sobrepõem e têm o mesmo profissional ou a
+mesma sala (campos em branco não contam, como nas agendas antigas). Os
+intervalos ocupados do dia vêm de uma única consulta pelo índice de
+(data, horario) e a verificação é feita em memória sobre a lista ordenada.
+No Postgres, exclusion constraints (migração 0012) garantem a mesma regra
+também para gravações concorrentes. Em lotes (importação, agendar_lote),
+OcupacaoDoLote aplica a regra entre as linhas ainda não gravadas.
+"""
+from collections import defaultdict
+from datetime import time
+
+from django.db.models import Q
+
+from .models import Agenda
+
+INICIO_EXPEDIENTE = time(8, 0)
+FIM_EXPEDIENTE = time(20, 0)
+PASSO_MINUTOS = 15
+
+
+def _minutos(horario):
+    return horario.hour * 60 + horario.minute
+
+
+def _horario(minutos):
+    return time(minutos // 60, minutos % 60)
+
+
+def ocupados(dia, profissional='', sala='', excluir=None):
+    """
+    Intervalos (inicio, fim, agenda) em minutos do dia, ordenados pelo
+    início, das agendas que usam o profissional ou a sala informados.
+    """
+    recurso = Q()
+    if profissional:
+        recurso |= Q(profissional=profissional)
+    if sala:
+        recurso |= Q(sala=sala)
+    if not recurso:
+        return []
+
+    consulta = Agenda.objects.filter(recurso, data=dia)
+    if excluir:
+        consulta = consulta.exclude(pk=excluir)
+    linhas = consulta.order_by('horario').values(
+        'id', 'horario', 'duracao', 'profissional', 'sala', 'cliente__nome',
+    )
+    return [
+        (_minutos(linha['horario']), _minutos(linha['horario']) + linha['duracao'], linha)
+        for linha in linhas
+    ]
+
+
+def conflitos(dia, horario, duracao, profissional='', sala='', excluir=None):
+    """Agendas (dicts) que se sobrepõem ao intervalo pedido no mesmo recurso."""
+    inicio = _minutos(horario)
+    fim = inicio + duracao
+    encontrados = []
+    for outro_inicio, outro_fim, agenda in ocupados(dia, profissional, sala, excluir):
+        if outro_inicio >= fim:
+            break  # lista ordenada: nenhum dos seguintes sobrepõe
+        if outro_fim > inicio:
+            encontrados.append(agenda)
+    return encontrados
+
+
+class OcupacaoDoLote:
+    """
+    Intervalos já aceitos num lote e ainda não gravados, por dia e recurso. O
+    AgendaForm só compara com o banco, então duas linhas sobrepostas do
+    mesmo arquivo passariam pela validação.
+    """
+
+    def __init__(self):
+        self._intervalos = defaultdict(list)
+
+    def ocupar(self, dados, origem):
+        """
+        Registra o intervalo da reserva (dict com data, horario, duracao,
+        profissional, sala). Se ele se sobrepuser a um já registrado, nada é
+        registrado e a `origem` daquele é devolvida; senão, None.
+        """
+        inicio = _minutos(dados['horario'])
+        fim = inicio + dados['duracao']
+        chaves = [
+            (dados['data'], campo, dados.get(campo))
+            for campo in ('profissional', 'sala') if dados.get(campo)
+        ]
+        for chave in chaves:
+            for outro_inicio, outro_fim, outra in self._intervalos.get(chave, ()):
+                if outro_inicio < fim and outro_fim > inicio:
+                    return outra
+        for chave in chaves:
+            self._intervalos[chave].append((inicio, fim, origem))
+        return None
+
+
+def descrever(agenda):
+    recurso = agenda['profissional'] or f"sala {agenda['sala']}"
+    return f"{agenda['cliente__nome']} às {agenda['horario']:%H:%M} ({recurso}, {agenda['duracao']} min)"
+
+
+def horarios_livres(dia, duracao, profissional='', sala='', inicio=INICIO_EXPEDIENTE,
+                    fim=FIM_EXPEDIENTE, passo=PASSO_MINUTOS):
+    """
+    Horários de início (a cada `passo` minutos) em que cabe um atendimento de
+    `duracao` minutos sem conflito, dentro do expediente. Uma consulta.
+    """
+    intervalos = ocupados(dia, profissional, sala)
+    livres = []
+    proximo = 0  # primeiro intervalo que ainda pode atrapalhar
+    limite = _minutos(fim) - duracao
+    candidato = _minutos(inicio)
+    while candidato <= limite:
+        # Intervalos que terminaram antes do candidato não atrapalham mais
+        while proximo < len(intervalos) and intervalos[proximo][1] <= candidato:
+            proximo += 1
+        livre = not any(
+            outro_inicio < candidato + duracao and outro_fim > candidato
+            for outro_inicio, outro_fim, _ in intervalos[proximo:]
+        )
+        if livre:
+            livres.append(_horario(candidato))
+        candidato += passo
+    return livres
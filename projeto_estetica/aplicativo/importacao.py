@@ -0,0 +1,262 @@
+"""
+Importação de agendas a partir de planilhas (CSV ou XLSX).
+
+O arquivo é lido linha a linha (módulo csv ou openpyxl em modo
+read_only), validado com o mesmo AgendaForm do cadastro e gravado em lotes
+via servicos.agendar_em_lote. Os clientes já resolvidos ficam num dicionário
+compartilhado entre os lotes, então cada nome é buscado no banco uma vez só.
+As linhas ficam em memória só até o lote ser gravado, mas esse dicionário
+cresce com o número de clientes distintos do arquivo.
+
+CSVs em UTF-8 (com ou sem BOM) e em cp1252, o padrão do Excel em português,
+são aceitos.
+"""
+import codecs
+import csv
+import time
+from datetime import date, datetime, time as hora
+from decimal import Decimal
+
+from .autocomplete import normalizar_nome
+from .forms import AgendaForm
+from .horarios import OcupacaoDoLote
+from .servicos import CAMPOS_AGENDA, TAMANHO_LOTE, ConflitoHorario, agendar_em_lote
+
+# Nomes de coluna aceitos (já normalizados) para cada campo do cadastro
+COLUNAS = {
+    'nome': 'nome', 'cliente': 'nome',
+    'telefone': 'telefone', 'celular': 'telefone', 'whatsapp': 'telefone',
+    'area': 'area',
+    'data': 'data', 'dia': 'data',
+    'horario': 'horario', 'hora': 'horario',
+    'tipo pacote': 'tipo_pacote', 'tipo de pacote': 'tipo_pacote', 'tipo': 'tipo_pacote',
+    'quantidade pacote': 'quantidade_pacote', 'quantidade': 'quantidade_pacote',
+    'qtde': 'quantidade_pacote',
+    'forma pagamento': 'forma_pagamento', 'forma de pagamento': 'forma_pagamento',
+    'pagamento': 'forma_pagamento',
+    'valor': 'valor',
+    'duracao': 'duracao', 'duracao min': 'duracao',
+    'profissional': 'profissional', 'sala': 'sala',
+}
+OBRIGATORIAS = {'nome', 'telefone', 'data', 'horario'}
+FORMATOS_DATA = ('%d/%m/%Y', '%d/%m/%y', '%Y-%m-%d')
+MAX_ERROS = 100
+
+
+class ErroImportacao(Exception):
+    pass
+
+
+def _normalizar_cabecalho(cabecalho):
+    campos = [COLUNAS.get(normalizar_nome(str(coluna or '').replace('_', ' ')))
+              for coluna in cabecalho]
+    faltando = OBRIGATORIAS - set(campos)
+    if faltando:
+        raise ErroImportacao(f"Colunas obrigatórias ausentes: {', '.join(sorted(faltando))}.")
+    return campos
+
+
+def _codificacao(arquivo):
+    """
+    'utf-8-sig' se o arquivo inteiro for UTF-8 válido, senão 'cp1252'. Lê em
+    blocos antes da importação, para não gravar lotes e só então descobrir
+    um caractere inválido no fim do arquivo.
+    """
+    decodificador = codecs.getincrementaldecoder('utf-8')()
+    try:
+        for bloco in iter(lambda: arquivo.read(64 * 1024), b''):
+            decodificador.decode(bloco)
+        decodificador.decode(b'', final=True)
+        return 'utf-8-sig'
+    except UnicodeDecodeError:
+        return 'cp1252'
+    finally:
+        arquivo.seek(0)
+
+
+def _linhas_csv(arquivo):
+    """Lê um CSV binário (UTF-8 ou cp1252) separado por vírgula, ponto e vírgula ou tab."""
+    codificacao = _codificacao(arquivo)
+    texto = codecs.getreader(codificacao)(arquivo)
+    try:
+        primeira = texto.readline()
+        try:
+            dialeto = csv.Sniffer().sniff(primeira, delimiters=',;\t')
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.reader(texto, dialeto)
+        yield next(csv.reader([primeira], dialeto), [])
+        yield from leitor
+    except UnicodeDecodeError:
+        raise ErroImportacao(
+            f"O arquivo não está em UTF-8 nem em {codificacao}: salve o CSV como UTF-8 e envie de novo."
+        )
+
+
+def _linhas_xlsx(arquivo):
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ErroImportacao("Importar XLSX requer o pacote openpyxl.")
+    planilha = load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        yield from planilha.active.iter_rows(values_only=True)
+    finally:
+        planilha.close()
+
+
+def _data(valor):
+    if isinstance(valor, datetime):
+        return valor.date()
+    if isinstance(valor, date):
+        return valor
+    texto = str(valor or '').strip()
+    for formato in FORMATOS_DATA:
+        try:
+            return datetime.strptime(texto, formato).date()
+        except ValueError:
+            pass
+    return texto
+
+
+def _horario(valor):
+    if isinstance(valor, datetime):
+        return valor.time()
+    if isinstance(valor, hora):
+        return valor
+    return str(valor or '').strip()
+
+
+def _valor(valor):
+    if valor is None or isinstance(valor, (int, float, Decimal)):
+        return valor
+    texto = str(valor).replace('R$', '').strip()
+    if ',' in texto:
+        # Formato brasileiro: 1.234,56
+        texto = texto.replace('.', '').replace(',', '.')
+    return texto
+
+
+def _opcao(valor):
+    """'Cartão' -> 'cartao', como nas opções do formulário."""
+    return normalizar_nome(str(valor or '')).replace(' ', '')
+
+
+def _registro(campos, linha):
+    registro = {}
+    for campo, valor in zip(campos, linha):
+        if campo is None:
+            continue
+        if campo == 'data':
+            valor = _data(valor)
+        elif campo == 'horario':
+            valor = _horario(valor)
+        elif campo == 'valor':
+            valor = _valor(valor)
+        elif campo in ('tipo_pacote', 'forma_pagamento'):
+            valor = _opcao(valor)
+        elif valor is None:
+            valor = ''
+        else:
+            valor = str(valor).strip()
+        registro[campo] = valor
+    return registro
+
+
+def ler_reservas(arquivo, nome_arquivo, erros, avisos=None):
+    """
+    Gera (número da linha, reserva) para cada linha válida do arquivo.
+    Linhas inválidas vão para `erros` como (número da linha, mensagem).
+    Linhas de um cliente já visto com telefone ou área diferentes são
+    importadas, mas os dados do cliente ficam os da primeira ocorrência e a
+    linha vai para `avisos`.
+    """
+    if nome_arquivo.lower().endswith('.xlsx'):
+        linhas = _linhas_xlsx(arquivo)
+    elif nome_arquivo.lower().endswith(('.csv', '.txt')):
+        linhas = _linhas_csv(arquivo)
+    else:
+        raise ErroImportacao("Formato não suportado: envie um arquivo .csv ou .xlsx.")
+
+    try:
+        campos = _normalizar_cabecalho(next(linhas))
+    except StopIteration:
+        raise ErroImportacao("O arquivo está vazio.")
+
+    def registrar_erro(numero, mensagem):
+        erros.append((numero, mensagem))
+        if len(erros) > MAX_ERROS:
+            raise ErroImportacao(
+                f"Mais de {MAX_ERROS} linhas inválidas; importação interrompida na linha {numero}."
+            )
+
+    ocupacao = OcupacaoDoLote()
+    primeiras = {}
+    for numero, linha in enumerate(linhas, start=2):
+        if not any(valor not in (None, '') for valor in linha):
+            continue
+        form = AgendaForm(data=_registro(campos, linha))
+        if not form.is_valid():
+            registrar_erro(numero, form.errors.as_text().replace('\n', ' '))
+            continue
+        dados = form.cleaned_data
+        outra = ocupacao.ocupar(dados, numero)
+        if outra is not None:
+            registrar_erro(numero, f"Horário em conflito com a linha {outra} (mesmo profissional ou sala).")
+            continue
+        contato = (dados['telefone'], dados['area'] or '')
+        primeira, contato_primeira = primeiras.setdefault(dados['nome'].upper(), (numero, contato))
+        if contato != contato_primeira and avisos is not None:
+            avisos.append((numero, (
+                f"Telefone/área de {dados['nome']} diferentes da linha {primeira}; "
+                f"mantidos os da linha {primeira}."
+            )))
+        yield numero, {
+            'nome': dados['nome'], 'telefone': dados['telefone'], 'area': dados['area'],
+            **{campo: dados.get(campo) for campo in CAMPOS_AGENDA},
+        }
+
+
+def importar(arquivo, nome_arquivo, tamanho_lote=TAMANHO_LOTE, progresso=None):
+    """
+    Importa o arquivo em lotes de `tamanho_lote` linhas. Cada lote é gravado
+    numa transação própria; `progresso(resultado)` é chamado após cada lote.
+    Retorna um dict com totais, tempo, linhas por segundo, erros e avisos.
+    """
+    inicio = time.perf_counter()
+    resultado = {
+        'linhas': 0, 'agendas': 0, 'clientes_novos': 0, 'clientes_atualizados': 0,
+        'erros': [], 'avisos': [], 'segundos': 0.0, 'linhas_por_segundo': 0.0,
+    }
+    clientes = {}
+
+    def gravar(lote):
+        totais = agendar_em_lote(lote, tamanho_lote=tamanho_lote, clientes=clientes)
+        for chave, quantidade in totais.items():
+            resultado[chave] += quantidade
+        resultado['segundos'] = time.perf_counter() - inicio
+        resultado['linhas_por_segundo'] = resultado['linhas'] / (resultado['segundos'] or 1)
+        if progresso:
+            progresso(resultado)
+
+    lote = []
+    try:
+        for _, reserva in ler_reservas(arquivo, nome_arquivo, resultado['erros'], resultado['avisos']):
+            resultado['linhas'] += 1
+            lote.append(reserva)
+            if len(lote) >= tamanho_lote:
+                gravar(lote)
+                lote = []
+        if lote:
+            gravar(lote)
+    except ConflitoHorario as e:
+        # Agendamento gravado por outra pessoa durante a importação (exclusion
+        # constraint do Postgres): o lote atual foi desfeito, os anteriores não
+        raise ErroImportacao(
+            f"{e} Importação interrompida; {resultado['agendas']} agenda(s) de lotes "
+            f"anteriores já foram gravadas."
+        )
+
+    resultado['segundos'] = time.perf_counter() - inicio
+    resultado['linhas_por_segundo'] = resultado['linhas'] / (resultado['segundos'] or 1)
+    return resultado
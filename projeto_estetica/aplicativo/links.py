@@ -0,0 +1,144 @@
+"""
+Links de assinatura assinados (modo sem banco).
+
+O link carrega o id do cliente, a validade e um nonce, assinados com
+django.core.signing (SECRET_KEY). Abrir o link só verifica a assinatura e lê
+o cache: os dados do cliente ficam em cache pela versão dos clientes e a
+lista de links revogados (LinkRevogado, pequena) fica inteira em cache.
+Nenhuma linha é gravada ao gerar o link.
+"""
+import time
+import uuid
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
+from django.core import signing
+from django.core.cache import cache
+
+from . import versoes
+
+SALT = 'aplicativo.links.contrato'
+CHAVE_REVOGADOS = 'links:revogados'
+TIMEOUT_CLIENTE = 24 * 60 * 60
+
+
+class LinkInvalido(Exception):
+    pass
+
+
+class LinkExpirado(LinkInvalido):
+    pass
+
+
+def gerar_token(cliente, validade_dias=0):
+    """Token assinado para o cliente; validade_dias=0 não expira."""
+    dados = {'c': cliente.pk, 'n': uuid.uuid4().hex[:12]}
+    if validade_dias:
+        dados['e'] = int(time.time()) + validade_dias * 24 * 60 * 60
+    return signing.dumps(dados, salt=SALT, compress=True)
+
+
+def ler_token(token):
+    """Valida a assinatura e devolve o payload, sem checar expiração."""
+    try:
+        return signing.loads(token, salt=SALT)
+    except signing.BadSignature:
+        raise LinkInvalido(token)
+
+
+def expira_em(dados):
+    if 'e' not in dados:
+        return None
+    return datetime.fromtimestamp(dados['e'], tz=dt_timezone.utc)
+
+
+def _revogados():
+    from .models import LinkRevogado
+
+    revogados = cache.get(CHAVE_REVOGADOS)
+    if revogados is None:
+        revogados = set(LinkRevogado.objects.values_list('nonce', flat=True))
+        cache.set(CHAVE_REVOGADOS, revogados, None)
+    return revogados
+
+
+def revogar(token):
+    """Coloca o link na lista de revogados. Retorna o payload do link."""
+    from .models import LinkRevogado
+
+    dados = ler_token(token)
+    LinkRevogado.objects.get_or_create(nonce=dados['n'], defaults={'expira_em': expira_em(dados)})
+    cache.delete(CHAVE_REVOGADOS)
+    return dados
+
+
+def limpar_revogados(agora):
+    """Apaga da lista os links que já expiraram de qualquer forma."""
+    from .models import LinkRevogado
+
+    apagados, _ = LinkRevogado.objects.filter(expira_em__lte=agora).delete()
+    if apagados:
+        cache.delete(CHAVE_REVOGADOS)
+    return apagados
+
+
+def _chave_cliente(versao, cliente_id):
+    return f'links:cliente:{versao}:{cliente_id}'
+
+
+def _consulta_cliente(cliente_id):
+    from .models import Cliente
+
+    return Cliente.objects.filter(pk=cliente_id).values('id', 'nome', 'telefone', 'area')
+
+
+def _dados_cliente(cliente_id):
+    chave = _chave_cliente(versoes.versao_clientes(), cliente_id)
+    dados = cache.get(chave)
+    if dados is None:
+        dados = _consulta_cliente(cliente_id).first()
+        if dados is None:
+            raise LinkInvalido(cliente_id)
+        cache.set(chave, dados, TIMEOUT_CLIENTE)
+    return dados
+
+
+def _validar(token, revogados):
+    dados = ler_token(token)
+    if dados.get('e') is not None and dados['e'] < time.time():
+        raise LinkExpirado(token)
+    if dados['n'] in revogados:
+        raise LinkExpirado(token)
+    return dados
+
+
+def cliente_do_link(token):
+    """
+    Dados do cliente (dict com id, nome, telefone e area) de um link válido.
+    Levanta LinkInvalido (ou LinkExpirado) caso contrário.
+    """
+    dados = _validar(token, _revogados())
+    return _dados_cliente(dados['c'])
+
+
+async def _arevogados():
+    from .models import LinkRevogado
+
+    revogados = await cache.aget(CHAVE_REVOGADOS)
+    if revogados is None:
+        revogados = {nonce async for nonce in LinkRevogado.objects.values_list('nonce', flat=True)}
+        await cache.aset(CHAVE_REVOGADOS, revogados, None)
+    return revogados
+
+
+async def acliente_do_link(token):
+    """cliente_do_link para views assíncronas."""
+    dados = _validar(token, await _arevogados())
+    chave = _chave_cliente(await sync_to_async(versoes.versao_clientes)(), dados['c'])
+    cliente = await cache.aget(chave)
+    if cliente is None:
+        cliente = await _consulta_cliente(dados['c']).afirst()
+        if cliente is None:
+            raise LinkInvalido(dados['c'])
+        await cache.aset(chave, cliente, TIMEOUT_CLIENTE)
+    return cliente
@@ -0,0 +1,60 @@
+import json
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aplicativo.forms import AgendaForm
+from aplicativo.horarios import OcupacaoDoLote
+from aplicativo.servicos import CAMPOS_AGENDA, ConflitoHorario, agendar_em_lote
+
+
+class Command(BaseCommand):
+    help = (
+        "Cadastra várias agendas de uma vez a partir de um JSON (lista de objetos "
+        "com os campos do cadastro: nome, telefone, area, data, horario, ...)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do JSON ou '-' para ler da entrada padrão.")
+        parser.add_argument('--lote', type=int, default=1000, help="Registros por bulk_create.")
+
+    def handle(self, *args, **options):
+        try:
+            if options['arquivo'] == '-':
+                registros = json.load(sys.stdin)
+            else:
+                with open(options['arquivo'], encoding='utf-8') as arquivo:
+                    registros = json.load(arquivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Não foi possível ler o JSON: {e}")
+        if not isinstance(registros, list):
+            raise CommandError("O JSON deve ser uma lista de agendas.")
+
+        # Mesma validação do formulário de cadastro
+        reservas = []
+        ocupacao = OcupacaoDoLote()
+        for numero, registro in enumerate(registros, start=1):
+            form = AgendaForm(data=registro)
+            if not form.is_valid():
+                raise CommandError(f"Registro {numero} inválido: {form.errors.as_text()}")
+            dados = form.cleaned_data
+            outro = ocupacao.ocupar(dados, numero)
+            if outro is not None:
+                raise CommandError(
+                    f"Registro {numero} em conflito com o registro {outro} (mesmo profissional ou sala)."
+                )
+            reservas.append({
+                'nome': dados['nome'], 'telefone': dados['telefone'], 'area': dados['area'],
+                **{campo: dados.get(campo) for campo in CAMPOS_AGENDA},
+            })
+
+        inicio = time.perf_counter()
+        try:
+            total = agendar_em_lote(reservas, tamanho_lote=options['lote'])
+        except ConflitoHorario as e:
+            raise CommandError(f"{e} Nada foi gravado.")
+        self.stdout.write(self.style.SUCCESS(
+            f"{total['agendas']} agenda(s), {total['clientes_novos']} cliente(s) novo(s) e "
+            f"{total['clientes_atualizados']} atualizado(s) em {time.perf_counter() - inicio:.2f}s."
+        ))
@@ -0,0 +1,41 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from aplicativo import links
+from aplicativo.models import ClienteLink
+
+
+class Command(BaseCommand):
+    help = (
+        "Arquiva os links de assinatura vencidos (expira_em no passado), "
+        "tirando-os da listagem principal, e limpa da lista de revogados os "
+        "links assinados que já expiraram. Pode rodar periodicamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--excluir-arquivados-dias', type=int, default=0,
+                            help="Exclui também links arquivados criados há mais de N dias (0 = não exclui).")
+
+    def handle(self, *args, **options):
+        agora = timezone.now()
+        arquivados = (
+            ClienteLink.objects
+            .filter(arquivado=False, expira_em__lte=agora)
+            .update(arquivado=True)
+        )
+        self.stdout.write(f"{arquivados} link(s) vencido(s) arquivado(s).")
+
+        revogados = links.limpar_revogados(agora)
+        self.stdout.write(f"{revogados} link(s) assinado(s) vencido(s) removido(s) da lista de revogados.")
+
+        dias = options['excluir_arquivados_dias']
+        if dias > 0:
+            _, por_modelo = (
+                ClienteLink.objects
+                .filter(arquivado=True, criado_em__lt=agora - timedelta(days=dias))
+                .delete()
+            )
+            excluidos = por_modelo.get(ClienteLink._meta.label, 0)
+            self.stdout.write(f"{excluidos} link(s) arquivado(s) excluído(s).")
@@ -0,0 +1,77 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+from django.db.backends.signals import connection_created
+from django.test import Client
+from django.test.utils import override_settings
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latência por requisição abrindo uma conexão nova com o banco a "
+        "cada requisição (CONN_MAX_AGE=0) e reaproveitando a conexão como "
+        "configurado em settings (CONN_MAX_AGE ou pool). Só faz leituras."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requisicoes', type=int, default=50)
+        parser.add_argument('--url', default='/painel-presenca/', help="Página requisitada (GET).")
+
+    def handle(self, *args, **options):
+        configurado = connection.settings_dict['CONN_MAX_AGE']
+        pool = bool(connection.settings_dict['OPTIONS'].get('pool'))
+        if pool:
+            self.stdout.write(self.style.WARNING(
+                "Pool ativo: as conexões vêm do pool nos dois cenários; "
+                "desative DB_POOL para medir o custo de uma conexão nova."
+            ))
+
+        cenarios = [
+            ('conexão nova por requisição', 0),
+            ('pool' if pool else f'CONN_MAX_AGE={configurado or 60}', configurado or 60),
+        ]
+        medianas = []
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            for rotulo, max_age in cenarios:
+                medianas.append(self._medir(rotulo, max_age, options))
+        connection.settings_dict['CONN_MAX_AGE'] = configurado
+        connection.close()
+
+        sem, com = medianas
+        self.stdout.write(self.style.SUCCESS(
+            f"\nMediana: {sem:.1f} ms -> {com:.1f} ms ({sem - com:.1f} ms a menos por requisição)."
+        ))
+
+    def _medir(self, rotulo, max_age, options):
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        conexoes = []
+
+        def contar(sender, connection, **kwargs):
+            conexoes.append(connection.alias)
+
+        cliente = Client()
+        amostras = []
+        connection_created.connect(contar)
+        try:
+            for _ in range(options['requisicoes']):
+                inicio = time.perf_counter()
+                # O test Client não dispara o fechamento de conexões do ciclo
+                # de requisição; chamamos como o handler WSGI faria
+                close_old_connections()
+                resposta = cliente.get(options['url'])
+                close_old_connections()
+                amostras.append((time.perf_counter() - inicio) * 1000)
+        finally:
+            connection_created.disconnect(contar)
+
+        amostras.sort()
+        p95 = amostras[int(len(amostras) * 0.95) - 1] if len(amostras) > 1 else amostras[0]
+        mediana = statistics.median(amostras)
+        self.stdout.write(
+            f"{rotulo:<32} status {resposta.status_code}  mediana {mediana:7.1f} ms  "
+            f"p95 {p95:7.1f} ms  conexões abertas: {len(conexoes)}"
+        )
+        return mediana
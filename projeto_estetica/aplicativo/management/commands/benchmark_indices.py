@@ -0,0 +1,226 @@
+import random
+import statistics
+import time
+from datetime import date, time as hora, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from aplicativo.autocomplete import normalizar_nome
+from aplicativo.models import Agenda, Cliente, Pacote, Painel
+from aplicativo.relatorios_pdf import COLUNAS
+
+# Índices criados pela migração 0007 que o benchmark compara
+INDICES = [
+    (Agenda, 'agenda_data_horario'),
+    (Cliente, 'cliente_nome_upper'),
+]
+
+DIA_INICIAL = date(2020, 1, 1)
+NOMES = ['Ana', 'Maria', 'João', 'José', 'Júlia', 'Lúcia', 'Pedro', 'Carla', 'Márcia', 'Paulo']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Santos', 'Lima', 'Gonçalves', 'Araújo', 'Melo']
+
+# No Postgres as tabelas do benchmark são criadas neste schema (dentro da
+# transação desfeita no final), nunca nas tabelas em uso
+SCHEMA_RASCUNHO = 'benchmark_indices'
+TABELAS = [Cliente, Pacote, Agenda, Painel]
+
+
+def _consultas(banco, dia, nome):
+    agendas = Agenda.objects.using(banco)
+    return [
+        ('painel_presenca', agendas.filter(data=dia).select_related('cliente').order_by('horario')),
+        ('relatorio_presenca', Painel.objects.using(banco).filter(agenda__data=dia)
+            .values_list('presenca', 'agenda__valor', 'agenda__cliente__nome')),
+        ('exportar_pdf (semana)', agendas.filter(data__range=(dia, dia + timedelta(days=6)))
+            .order_by('data', 'horario', 'id').values_list(*COLUNAS)[:2000]),
+        ('cadastro_agenda (iexact)', Cliente.objects.using(banco).filter(nome__iexact=nome)[:1]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera uma massa sintética de agendas e compara planos e tempos das "
+        "consultas principais sem e com os índices da migração 0007. "
+        "Tudo roda numa transação desfeita no final: nada fica gravado. No "
+        "Postgres as tabelas são cópias vazias num schema de rascunho. Use um "
+        "banco próprio (--banco) ou confirme o banco padrão com --confirmar-banco."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--banco', default=DEFAULT_DB_ALIAS,
+                            help="Alias em DATABASES onde o benchmark roda.")
+        parser.add_argument('--confirmar-banco', action='store_true',
+                            help="Permite rodar no banco padrão (o da aplicação).")
+        parser.add_argument('--agendas', type=int, default=3_000_000)
+        parser.add_argument('--clientes', type=int, default=50_000)
+        parser.add_argument('--dias', type=int, default=3 * 365)
+        parser.add_argument('--repeticoes', type=int, default=5)
+        parser.add_argument('--sem-planos', action='store_true',
+                            help="Mostra só os tempos, sem os planos de execução.")
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.banco = options['banco']
+        if self.banco not in connections:
+            raise CommandError(f"Banco {self.banco!r} não está em DATABASES.")
+        if self.banco == DEFAULT_DB_ALIAS and not options['confirmar_banco']:
+            raise CommandError(
+                "O benchmark gera milhões de linhas e apaga índices: use um banco "
+                "próprio com --banco ou confirme o banco padrão com --confirmar-banco."
+            )
+        self.connection = connections[self.banco]
+
+        with transaction.atomic(using=self.banco):
+            self._preparar_tabelas()
+
+            inicio = time.perf_counter()
+            self._gerar_massa()
+            self.stdout.write(f"Massa gerada em {time.perf_counter() - inicio:.1f}s")
+
+            dia = DIA_INICIAL + timedelta(days=options['dias'] // 2)
+            nome = Cliente.objects.using(self.banco).order_by('?').values_list('nome', flat=True).first()
+
+            self._alterar_indices(criar=False)
+            self._analisar()
+            antes = self._medir('SEM os índices', dia, nome)
+
+            self._alterar_indices(criar=True)
+            self._analisar()
+            depois = self._medir('COM os índices', dia, nome)
+
+            self.stdout.write("\nResumo (mediana em ms):")
+            for rotulo, tempo in antes.items():
+                ganho = tempo / depois[rotulo] if depois[rotulo] else float('inf')
+                self.stdout.write(
+                    f"  {rotulo:<28} {tempo:>10.2f} -> {depois[rotulo]:>8.2f}  ({ganho:.1f}x)"
+                )
+            transaction.set_rollback(True, using=self.banco)
+
+    def _preparar_tabelas(self):
+        if self.connection.vendor != 'postgresql':
+            # SQLite e afins: DDL transacional num banco local, desfeito no final
+            return
+        with self.connection.cursor() as cursor:
+            # Sem o limite de DB_STATEMENT_TIMEOUT: a geração da massa é longa
+            cursor.execute('SET LOCAL statement_timeout = 0')
+            cursor.execute(f'CREATE SCHEMA {SCHEMA_RASCUNHO}')
+            # Nomes sem schema (ORM e SQL abaixo) passam a apontar para as cópias
+            cursor.execute(f'SET LOCAL search_path TO {SCHEMA_RASCUNHO}, public')
+        with self.connection.schema_editor() as editor:
+            for model in TABELAS:
+                editor.create_model(model)
+
+    def _alterar_indices(self, criar):
+        # SQL montado sem abrir o schema editor, que no SQLite não pode ser
+        # usado dentro de uma transação
+        editor = self.connection.schema_editor()
+        with self.connection.cursor() as cursor:
+            for model, nome in INDICES:
+                if criar:
+                    indice = next(i for i in model._meta.indexes if i.name == nome)
+                    cursor.execute(str(indice.create_sql(model, editor)))
+                else:
+                    cursor.execute(editor.sql_delete_index % {'name': editor.quote_name(nome)})
+
+    def _analisar(self):
+        if self.connection.vendor == 'postgresql':
+            with self.connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {", ".join(model._meta.db_table for model in TABELAS)}')
+        elif self.connection.vendor == 'sqlite':
+            with self.connection.cursor() as cursor:
+                cursor.execute('ANALYZE')
+
+    def _medir(self, titulo, dia, nome):
+        self.stdout.write(f"\n===== {titulo} =====")
+        tempos = {}
+        for rotulo, consulta in _consultas(self.banco, dia, nome):
+            amostras = []
+            for _ in range(self.options['repeticoes']):
+                inicio = time.perf_counter()
+                list(consulta.all())
+                amostras.append((time.perf_counter() - inicio) * 1000)
+            tempos[rotulo] = statistics.median(amostras)
+            self.stdout.write(f"\n-- {rotulo}: {tempos[rotulo]:.2f} ms")
+            if not self.options['sem_planos']:
+                analisar = {'analyze': True} if self.connection.vendor == 'postgresql' else {}
+                self.stdout.write(consulta.explain(**analisar))
+        return tempos
+
+    def _gerar_massa(self):
+        total_clientes = self.options['clientes']
+        total_agendas = self.options['agendas']
+        dias = self.options['dias']
+
+        aleatorio = random.Random(42)
+        lote = []
+        for i in range(total_clientes):
+            nome = f"{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)} {i}"
+            lote.append(Cliente(
+                nome=nome, nome_normalizado=normalizar_nome(nome),
+                telefone=f"{i:011d}", area='Geral',
+            ))
+            if len(lote) == 5000:
+                Cliente.objects.using(self.banco).bulk_create(lote)
+                lote = []
+        Cliente.objects.using(self.banco).bulk_create(lote)
+
+        if self.connection.vendor == 'postgresql':
+            self._gerar_agendas_postgres(total_agendas, dias)
+        else:
+            self._gerar_agendas_orm(total_agendas, dias, aleatorio)
+        self.stdout.write(f"{total_clientes} clientes e {total_agendas} agendas sintéticos.")
+
+    def _gerar_agendas_postgres(self, total, dias):
+        # generate_series é ordens de grandeza mais rápido que bulk_create aqui
+        agenda = Agenda._meta.db_table
+        painel = Painel._meta.db_table
+        cliente = Cliente._meta.db_table
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"SELECT min(id), max(id) FROM {cliente}")
+            menor, maior = cursor.fetchone()
+            cursor.execute(f"SELECT coalesce(max(id), 0) FROM {agenda}")
+            ultimo = cursor.fetchone()[0]
+            cursor.execute(
+                f"""
+                INSERT INTO {agenda} (cliente_id, data, horario, tipo_pacote, forma_pagamento, valor,
+                                      duracao, profissional, sala)
+                SELECT %s + (random() * (%s - %s))::bigint,
+                       %s::date + (random() * %s)::int,
+                       time '08:00' + (random() * 40)::int * interval '15 minutes',
+                       (ARRAY['avulso', 'pacote', 'parceria'])[1 + (random() * 2)::int],
+                       (ARRAY['pix', 'dinheiro', 'cartao'])[1 + (random() * 2)::int],
+                       round((50 + random() * 250)::numeric, 2),
+                       60, '', ''
+                FROM generate_series(1, %s)
+                """,
+                [menor, maior, menor, DIA_INICIAL, dias - 1, total],
+            )
+            cursor.execute(
+                f"INSERT INTO {painel} (agenda_id, presenca) "
+                f"SELECT id, random() < 0.8 FROM {agenda} WHERE id > %s",
+                [ultimo],
+            )
+
+    def _gerar_agendas_orm(self, total, dias, aleatorio):
+        ids = list(Cliente.objects.using(self.banco).values_list('id', flat=True))
+        criados = 0
+        while criados < total:
+            quantidade = min(10_000, total - criados)
+            agendas = Agenda.objects.using(self.banco).bulk_create([
+                Agenda(
+                    cliente_id=aleatorio.choice(ids),
+                    data=DIA_INICIAL + timedelta(days=aleatorio.randrange(dias)),
+                    horario=hora(8 + aleatorio.randrange(10), aleatorio.choice((0, 15, 30, 45))),
+                    tipo_pacote=aleatorio.choice(('avulso', 'pacote', 'parceria')),
+                    forma_pagamento=aleatorio.choice(('pix', 'dinheiro', 'cartao')),
+                    valor=aleatorio.randrange(5000, 30000) / 100,
+                )
+                for _ in range(quantidade)
+            ])
+            Painel.objects.using(self.banco).bulk_create([
+                Painel(agenda=agenda, presenca=aleatorio.random() < 0.8) for agenda in agendas
+            ])
+            criados += quantidade
+            self.stdout.write(f"  {criados}/{total} agendas", ending='\r')
+        self.stdout.write('')
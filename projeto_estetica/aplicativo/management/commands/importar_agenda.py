@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from aplicativo.importacao import ErroImportacao, importar
+from aplicativo.servicos import TAMANHO_LOTE
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa agendas de uma planilha CSV ou XLSX (colunas nome, telefone, area, "
+        "data, horario, tipo_pacote, quantidade_pacote, forma_pagamento, valor). "
+        "Linhas inválidas são listadas e ignoradas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('arquivo', help="Caminho do arquivo .csv ou .xlsx.")
+        parser.add_argument('--lote', type=int, default=TAMANHO_LOTE,
+                            help="Linhas gravadas por transação/bulk_create.")
+
+    def handle(self, *args, **options):
+        if options['lote'] < 1:
+            raise CommandError("--lote deve ser maior que zero.")
+
+        def progresso(resultado):
+            self.stdout.write(
+                f"  {resultado['linhas']} linha(s) em {resultado['segundos']:.1f}s "
+                f"({resultado['linhas_por_segundo']:.0f} linhas/s)"
+            )
+
+        try:
+            with open(options['arquivo'], 'rb') as arquivo:
+                resultado = importar(arquivo, options['arquivo'], options['lote'], progresso)
+        except OSError as e:
+            raise CommandError(f"Não foi possível abrir o arquivo: {e}")
+        except ErroImportacao as e:
+            raise CommandError(str(e))
+
+        for numero, mensagem in resultado['erros']:
+            self.stderr.write(f"Linha {numero}: {mensagem}")
+        for numero, mensagem in resultado['avisos']:
+            self.stderr.write(f"Linha {numero} (aviso): {mensagem}")
+        self.stdout.write(self.style.SUCCESS(
+            f"{resultado['agendas']} agenda(s), {resultado['clientes_novos']} cliente(s) novo(s) e "
+            f"{resultado['clientes_atualizados']} atualizado(s) em {resultado['segundos']:.2f}s "
+            f"({resultado['linhas_por_segundo']:.0f} linhas/s); "
+            f"{len(resultado['erros'])} linha(s) ignorada(s)."
+        ))
@@ -0,0 +1,87 @@
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+# Este módulo é importado pelos processos do pool antes do django.setup(),
+# por isso os models e a fila só são importados dentro das funções.
+
+
+def _iniciar_processo():
+    # Processos criados com "spawn" começam sem o Django configurado
+    django.setup()
+
+
+def _executar(pk):
+    from aplicativo import tarefas
+
+    return tarefas.executar_tarefa(pk)
+
+
+class Command(BaseCommand):
+    help = "Processa as exportações de PDF enfileiradas, num pool de processos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--processos', type=int, default=2,
+                            help="Quantidade de processos geradores (padrão: 2).")
+        parser.add_argument('--intervalo', type=float, default=2.0,
+                            help="Segundos entre consultas à fila quando ela está vazia.")
+        parser.add_argument('--uma-vez', action='store_true',
+                            help="Processa o que estiver pendente e encerra.")
+        parser.add_argument('--travadas-minutos', type=int, default=30,
+                            help="Tarefas em processamento há mais tempo voltam para a fila.")
+        parser.add_argument('--retencao-horas', type=int, default=24,
+                            help="Tarefas finalizadas há mais tempo são apagadas.")
+
+    def handle(self, *args, **options):
+        from aplicativo import tarefas
+        from aplicativo.models import TarefaRelatorio
+
+        processos = max(1, options['processos'])
+        intervalo = options['intervalo']
+
+        liberadas = tarefas.liberar_travadas(options['travadas_minutos'])
+        if liberadas:
+            self.stdout.write(f"{liberadas} tarefa(s) travada(s) devolvida(s) à fila.")
+
+        contexto = multiprocessing.get_context('spawn')
+        em_execucao = {}
+        ultima_limpeza = float('-inf')
+
+        with ProcessPoolExecutor(processos, mp_context=contexto, initializer=_iniciar_processo) as pool:
+            while True:
+                livres = processos - len(em_execucao)
+                if livres:
+                    for pk in tarefas.reservar_pendentes(livres):
+                        em_execucao[pool.submit(_executar, pk)] = pk
+
+                if time.monotonic() - ultima_limpeza > 3600:
+                    removidas = tarefas.limpar_antigas(options['retencao_horas'])
+                    if removidas:
+                        self.stdout.write(f"{removidas} tarefa(s) antiga(s) removida(s).")
+                    ultima_limpeza = time.monotonic()
+
+                if not em_execucao:
+                    if options['uma_vez']:
+                        break
+                    # Não segura uma conexão do pooler enquanto a fila está vazia
+                    connections.close_all()
+                    time.sleep(intervalo)
+                    continue
+
+                concluidas, _ = wait(em_execucao, timeout=intervalo, return_when=FIRST_COMPLETED)
+                for futuro in concluidas:
+                    pk = em_execucao.pop(futuro)
+                    try:
+                        status = futuro.result()
+                    except Exception as e:
+                        tarefas.marcar_erro(pk, f"Falha no processo gerador: {e}")
+                        if isinstance(e, BrokenProcessPool):
+                            # O pool não aceita mais tarefas; o supervisor reinicia o worker
+                            raise CommandError("Pool de processos interrompido.") from e
+                        status = TarefaRelatorio.ERRO
+                    self.stdout.write(f"Tarefa {pk}: {status}")
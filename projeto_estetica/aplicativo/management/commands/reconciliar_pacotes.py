@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from aplicativo.pacotes import reconciliar
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula as sessões usadas e agendadas de cada pacote a partir das "
+        "agendas ligadas a ele e suas presenças (corrige saldos divergentes)."
+    )
+
+    def handle(self, *args, **options):
+        corrigidos = reconciliar()
+        self.stdout.write(self.style.SUCCESS(f"{corrigidos} pacote(s) corrigido(s)."))
@@ -0,0 +1,28 @@
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from aplicativo import resumos
+
+
+def _data(valor):
+    try:
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise CommandError(f"Data inválida: {valor} (use AAAA-MM-DD)")
+
+
+class Command(BaseCommand):
+    help = "Recalcula a tabela ResumoDiario a partir das agendas (backfill/correção)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--inicio', type=_data, help="Primeiro dia (AAAA-MM-DD).")
+        parser.add_argument('--fim', type=_data, help="Último dia (AAAA-MM-DD).")
+
+    def handle(self, *args, **options):
+        inicio = time.perf_counter()
+        dias = resumos.reconstruir(options['inicio'], options['fim'])
+        self.stdout.write(self.style.SUCCESS(
+            f"{dias} dia(s) recalculado(s) em {time.perf_counter() - inicio:.1f}s."
+        ))
@@ -0,0 +1,87 @@
+import json
+import math
+import os
+import statistics
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+ORDENACOES = {
+    'consultas': lambda resumo: resumo['consultas_max'],
+    'total': lambda resumo: resumo['total_p95'],
+    'db': lambda resumo: resumo['db_medio'],
+    'requisicoes': lambda resumo: resumo['requisicoes'],
+}
+
+
+def _p95(valores):
+    valores = sorted(valores)
+    return valores[math.ceil(len(valores) * 0.95) - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Resume por view as métricas gravadas pelo MetricasMiddleware "
+        "(METRICAS_ATIVAS=True): consultas, tempo de banco, de template, "
+        "tempo total e tamanho das respostas, marcando quem passou do orçamento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--arquivo', default=None, help="Padrão: settings.METRICAS_ARQUIVO.")
+        parser.add_argument('--ordenar', choices=sorted(ORDENACOES), default='consultas')
+        parser.add_argument('--limpar', action='store_true', help="Apaga o arquivo depois do relatório.")
+
+    def handle(self, *args, **options):
+        caminho = options['arquivo'] or settings.METRICAS_ARQUIVO
+        if not os.path.exists(caminho):
+            raise CommandError(f"Nenhuma métrica em {caminho}. Ligue METRICAS_ATIVAS e faça algumas requisições.")
+
+        por_view = defaultdict(list)
+        with open(caminho, encoding='utf-8') as arquivo:
+            for linha in arquivo:
+                try:
+                    registro = json.loads(linha)
+                except ValueError:
+                    continue  # linha truncada por um worker interrompido
+                por_view[registro['view']].append(registro)
+
+        resumos = []
+        for view, registros in por_view.items():
+            consultas = [r['consultas'] for r in registros]
+            totais = [r['total_ms'] for r in registros]
+            tamanhos = [r['bytes'] for r in registros if r['bytes'] is not None]
+            orcamento = registros[-1]['orcamento']
+            resumos.append({
+                'view': view,
+                'requisicoes': len(registros),
+                'consultas_media': statistics.mean(consultas),
+                'consultas_max': max(consultas),
+                'orcamento': orcamento,
+                'excedidas': sum(1 for c in consultas if orcamento is not None and c > orcamento),
+                'db_medio': statistics.mean(r['db_ms'] for r in registros),
+                'template_medio': statistics.mean(r['template_ms'] for r in registros),
+                'total_p50': statistics.median(totais),
+                'total_p95': _p95(totais),
+                'bytes_medio': statistics.mean(tamanhos) if tamanhos else 0,
+            })
+        resumos.sort(key=ORDENACOES[options['ordenar']], reverse=True)
+
+        self.stdout.write(
+            f"{'view':<48} {'req':>5} {'cons':>6} {'max':>4} {'orç':>4} "
+            f"{'db ms':>7} {'tpl ms':>7} {'p50 ms':>7} {'p95 ms':>7} {'KB':>7}"
+        )
+        for r in resumos:
+            linha = (
+                f"{r['view'][-48:]:<48} {r['requisicoes']:>5} {r['consultas_media']:>6.1f} "
+                f"{r['consultas_max']:>4} {r['orcamento'] if r['orcamento'] is not None else '-':>4} "
+                f"{r['db_medio']:>7.1f} {r['template_medio']:>7.1f} {r['total_p50']:>7.1f} "
+                f"{r['total_p95']:>7.1f} {r['bytes_medio'] / 1024:>7.1f}"
+            )
+            if r['excedidas']:
+                self.stdout.write(self.style.ERROR(f"{linha}  <- {r['excedidas']} acima do orçamento"))
+            else:
+                self.stdout.write(linha)
+
+        if options['limpar']:
+            os.remove(caminho)
@@ -0,0 +1,161 @@
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+CAMINHOS_PADRAO = ['/autocomplete-cliente/?term=a', '/clientes/opcoes/?q=a']
+
+# Os mesmos comandos dos Procfiles, em portas locais
+PERFIS = {
+    'wsgi': ['projeto_estetica.wsgi:application'],
+    'asgi': ['projeto_estetica.asgi:application', '--worker-class', 'uvicorn_worker.UvicornWorker'],
+}
+
+
+def _percentil(amostras, fracao):
+    return amostras[max(int(len(amostras) * fracao + 0.5) - 1, 0)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de carga comparando o deploy ASGI (gunicorn + uvicorn, Procfile) "
+        "com o síncrono (gunicorn, Procfile.wsgi): requisições por segundo, p50 "
+        "e p99. Use --subir para iniciar os dois servidores localmente ou "
+        "--alvo nome=url para servidores já no ar. Só faz GETs."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alvo', action='append', default=[], metavar='NOME=URL',
+                            help="Servidor já no ar, ex.: --alvo wsgi=http://127.0.0.1:8000")
+        parser.add_argument('--subir', action='store_true',
+                            help="Sobe os perfis wsgi e asgi com gunicorn em portas locais.")
+        parser.add_argument('--workers', type=int, default=2, help="Workers de cada servidor (--subir).")
+        parser.add_argument('--porta', type=int, default=8101, help="Primeira porta usada por --subir.")
+        parser.add_argument('--caminho', action='append', default=[],
+                            help=f"Caminho requisitado (repetível). Padrão: {', '.join(CAMINHOS_PADRAO)}")
+        parser.add_argument('--concorrencia', type=int, default=32, help="Clientes simultâneos.")
+        parser.add_argument('--segundos', type=float, default=10.0, help="Duração de cada medição.")
+
+    def handle(self, *args, **options):
+        alvos = []
+        for alvo in options['alvo']:
+            nome, _, url = alvo.partition('=')
+            if not url:
+                raise CommandError(f"Use nome=url em --alvo (recebido {alvo!r}).")
+            alvos.append((nome, url.rstrip('/')))
+        if not alvos and not options['subir']:
+            raise CommandError("Informe --alvo nome=url ou use --subir.")
+
+        caminhos = options['caminho'] or CAMINHOS_PADRAO
+        processos = []
+        try:
+            if options['subir']:
+                for deslocamento, perfil in enumerate(PERFIS):
+                    porta = options['porta'] + deslocamento
+                    processos.append(self._subir(perfil, porta, options['workers']))
+                    alvos.append((perfil, f'http://127.0.0.1:{porta}'))
+
+            self.stdout.write(
+                f"{options['concorrencia']} clientes, {options['segundos']:.0f}s por alvo, "
+                f"caminhos: {', '.join(caminhos)}\n"
+            )
+            for nome, url in alvos:
+                self._medir(nome, url, caminhos, options)
+        finally:
+            for processo in processos:
+                processo.terminate()
+            for processo in processos:
+                try:
+                    processo.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    processo.kill()
+
+    def _subir(self, perfil, porta, workers):
+        env = dict(os.environ)
+        env['ALLOWED_HOSTS'] = ','.join(filter(None, [env.get('ALLOWED_HOSTS'), '127.0.0.1']))
+        if perfil == 'asgi':
+            # Como no Procfile: sem conexões persistentes no modo assíncrono
+            env['DB_CONN_MAX_AGE'] = '0'
+        comando = [
+            sys.executable, '-m', 'gunicorn', *PERFIS[perfil],
+            '--workers', str(workers), '--bind', f'127.0.0.1:{porta}', '--log-level', 'warning',
+        ]
+        processo = subprocess.Popen(comando, cwd=settings.BASE_DIR, env=env)
+        limite = time.monotonic() + 30
+        while time.monotonic() < limite:
+            if processo.poll() is not None:
+                raise CommandError(f"O servidor {perfil} encerrou ao iniciar (gunicorn/uvicorn instalados?).")
+            try:
+                socket.create_connection(('127.0.0.1', porta), timeout=1).close()
+                return processo
+            except OSError:
+                time.sleep(0.2)
+        processo.kill()
+        raise CommandError(f"O servidor {perfil} não abriu a porta {porta} em 30s.")
+
+    def _medir(self, nome, url, caminhos, options):
+        partes = urlsplit(url)
+        conexao_classe = http.client.HTTPSConnection if partes.scheme == 'https' else http.client.HTTPConnection
+        prefixo = partes.path.rstrip('/')
+        fim = time.monotonic() + options['segundos']
+        amostras = []
+        erros = []
+        trava = threading.Lock()
+
+        def cliente(numero):
+            conexao = None
+            locais, falhas = [], 0
+            indice = numero
+            while time.monotonic() < fim:
+                caminho = prefixo + caminhos[indice % len(caminhos)]
+                indice += 1
+                inicio = time.perf_counter()
+                try:
+                    if conexao is None:
+                        conexao = conexao_classe(partes.netloc, timeout=30)
+                    conexao.request('GET', caminho)
+                    resposta = conexao.getresponse()
+                    resposta.read()
+                    if resposta.status >= 400:
+                        falhas += 1
+                    # O gunicorn síncrono fecha a conexão a cada resposta
+                    if resposta.will_close:
+                        conexao.close()
+                        conexao = None
+                except (OSError, http.client.HTTPException):
+                    falhas += 1
+                    if conexao is not None:
+                        conexao.close()
+                    conexao = None
+                    continue
+                locais.append((time.perf_counter() - inicio) * 1000)
+            if conexao is not None:
+                conexao.close()
+            with trava:
+                amostras.extend(locais)
+                erros.append(falhas)
+
+        inicio = time.monotonic()
+        threads = [threading.Thread(target=cliente, args=(i,)) for i in range(options['concorrencia'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        duracao = time.monotonic() - inicio
+
+        if not amostras:
+            self.stdout.write(self.style.ERROR(f"{nome:<8} nenhuma resposta de {url} ({sum(erros)} erros)"))
+            return
+        amostras.sort()
+        self.stdout.write(
+            f"{nome:<8} {len(amostras) / duracao:8.1f} req/s  "
+            f"p50 {_percentil(amostras, 0.50):7.1f} ms  p99 {_percentil(amostras, 0.99):7.1f} ms  "
+            f"erros {sum(erros)}  ({url})"
+        )
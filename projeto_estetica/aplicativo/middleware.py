@@ -0,0 +1,191 @@
+"""
+Middlewares do projeto.
+
+ArquivosEstaticosMiddleware: o WhiteNoise com suporte a ASGI.
+
+MetricasMiddleware: métricas por requisição (liga com METRICAS_ATIVAS=True).
+
+Para cada requisição mede o número de consultas SQL e o tempo gasto no banco
+(execute_wrapper em todas as conexões), o tempo de renderização dos
+templates e o tamanho da resposta. Os números vão no cabeçalho
+Server-Timing (visível no DevTools do navegador) e numa linha JSON em
+METRICAS_ARQUIVO, que manage.py relatorio_metricas resume por view.
+Requisições acima do @orcamento_consultas da view geram um aviso no log.
+"""
+import json
+import logging
+import threading
+import time
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils import timezone
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from .orcamento import orcamento_da_view
+
+logger = logging.getLogger(__name__)
+
+_medicao = ContextVar('metricas_medicao', default=None)
+_render_original = None
+
+
+class ArquivosEstaticosMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware que também funciona em modo assíncrono. O whitenoise
+    só é síncrono, e um middleware síncrono na cadeia faz o Django (no ASGI)
+    levar cada requisição para uma thread, anulando as views assíncronas.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            # Abre o arquivo e lê o stat: fica fora do event loop
+            response = await sync_to_async(self.serve)(static_file, request)
+            response.streaming_content = _ler_em_blocos(response.file_to_stream, response.block_size)
+            return response
+        return await self.get_response(request)
+
+
+async def _ler_em_blocos(arquivo, tamanho):
+    # O handler ASGI consumiria o iterador síncrono do FileResponse de uma vez.
+    # HEAD e 304 não têm arquivo (corpo vazio)
+    if arquivo is None:
+        return
+    ler = sync_to_async(arquivo.read)
+    while bloco := await ler(tamanho):
+        yield bloco
+
+
+class Medicao:
+    def __init__(self):
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.tempo_template = 0.0
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicao = _medicao.get()
+    if medicao is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicao.consultas += 1
+        medicao.tempo_db += time.perf_counter() - inicio
+
+
+def _instrumentar_templates():
+    """Envolve Template.render do backend do Django (uma vez por processo)."""
+    global _render_original
+    if _render_original is not None:
+        return
+    _render_original = Template.render
+
+    def render(self, context=None, request=None):
+        medicao = _medicao.get()
+        if medicao is None:
+            return _render_original(self, context, request)
+        inicio = time.perf_counter()
+        try:
+            return _render_original(self, context, request)
+        finally:
+            medicao.tempo_template += time.perf_counter() - inicio
+
+    Template.render = render
+
+
+def _nome_view(view):
+    if view is None:
+        return '-'
+    return f'{view.__module__}.{getattr(view, "__qualname__", view.__class__.__name__)}'
+
+
+class MetricasMiddleware:
+    # Só síncrono: no ASGI as consultas das views assíncronas rodam em outra
+    # thread (outra conexão), fora do execute_wrapper
+    sync_capable = True
+    async_capable = False
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.arquivo = settings.METRICAS_ARQUIVO
+        self.trava = threading.Lock()
+        _instrumentar_templates()
+
+    def __call__(self, request):
+        medicao = Medicao()
+        token = _medicao.set(medicao)
+        inicio = time.perf_counter()
+        try:
+            with ExitStack() as pilha:
+                for conexao in connections.all():
+                    pilha.enter_context(conexao.execute_wrapper(_medir_consulta))
+                response = self.get_response(request)
+        finally:
+            _medicao.reset(token)
+        total = (time.perf_counter() - inicio) * 1000
+
+        db = medicao.tempo_db * 1000
+        template = medicao.tempo_template * 1000
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={db:.1f};desc="{medicao.consultas} consultas"',
+            f'tpl;dur={template:.1f}',
+            f'total;dur={total:.1f}',
+        ])
+
+        view = getattr(request, '_metricas_view', None)
+        orcamento = orcamento_da_view(view)
+        nome = _nome_view(view)
+        if orcamento is not None and medicao.consultas > orcamento:
+            logger.warning(
+                "%s fez %d consultas (orçamento %d): %s",
+                nome, medicao.consultas, orcamento, request.get_full_path(),
+            )
+
+        self._registrar({
+            'em': timezone.now().isoformat(timespec='seconds'),
+            'view': nome,
+            'metodo': request.method,
+            'status': response.status_code,
+            'consultas': medicao.consultas,
+            'orcamento': orcamento,
+            'db_ms': round(db, 2),
+            'template_ms': round(template, 2),
+            'total_ms': round(total, 2),
+            'bytes': None if response.streaming else len(response.content),
+        })
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._metricas_view = view_func
+
+    def _registrar(self, registro):
+        # Uma linha curta por requisição em modo append: várias threads e
+        # workers podem escrever no mesmo arquivo
+        linha = json.dumps(registro, ensure_ascii=False) + '\n'
+        try:
+            with self.trava, open(self.arquivo, 'a', encoding='utf-8') as arquivo:
+                arquivo.write(linha)
+        except OSError:
+            logger.exception("Não foi possível gravar as métricas em %s", self.arquivo)
@@ -0,0 +1,94 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def _esquema_antigo(conexao):
+    """O banco ainda está no esquema das migrações 0001-0003 (agenda com nome)?"""
+    with conexao.cursor() as cursor:
+        colunas = conexao.introspection.get_table_description(cursor, 'aplicativo_agenda')
+    return any(coluna.name == 'nome' for coluna in colunas)
+
+
+class SoNoEsquemaAntigo(migrations.SeparateDatabaseAndState):
+    """
+    O banco de produção foi criado a partir dos modelos, não destas
+    migrações, e já tem o esquema final: lá as operações só atualizam o
+    estado. Bancos criados pelas migrações recebem as alterações normalmente.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if _esquema_antigo(schema_editor.connection):
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+
+OPERACOES = [
+    migrations.RemoveField(
+        model_name='agenda',
+        name='nome',
+    ),
+    migrations.RemoveField(
+        model_name='agenda',
+        name='quantidade_pacote_restante',
+    ),
+    migrations.RemoveField(
+        model_name='agenda',
+        name='telefone',
+    ),
+    migrations.AddField(
+        model_name='cliente',
+        name='area',
+        field=models.CharField(default='Geral', max_length=100),
+    ),
+    migrations.AlterField(
+        model_name='agenda',
+        name='forma_pagamento',
+        field=models.CharField(blank=True, max_length=30, null=True),
+    ),
+    migrations.AlterField(
+        model_name='agenda',
+        name='quantidade_pacote',
+        field=models.CharField(blank=True, max_length=30, null=True),
+    ),
+    migrations.AlterField(
+        model_name='agenda',
+        name='tipo_pacote',
+        field=models.CharField(blank=True, max_length=30, null=True),
+    ),
+    migrations.AlterField(
+        model_name='agenda',
+        name='valor',
+        field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+    ),
+    migrations.AlterField(
+        model_name='cliente',
+        name='telefone',
+        field=models.CharField(max_length=20),
+    ),
+    migrations.AlterField(
+        model_name='painel',
+        name='agenda',
+        field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to='aplicativo.agenda'),
+    ),
+    migrations.CreateModel(
+        name='ClienteLink',
+        fields=[
+            ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+            ('codigo', models.CharField(max_length=50, unique=True)),
+            ('link_completo', models.CharField(max_length=255, unique=True)),
+            ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='aplicativo.cliente')),
+        ],
+    ),
+]
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0003_rename_presença_painel_presenca'),
+    ]
+
+    operations = [
+        SoNoEsquemaAntigo(database_operations=OPERACOES, state_operations=OPERACOES),
+    ]
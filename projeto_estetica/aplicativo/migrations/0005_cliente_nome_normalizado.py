@@ -0,0 +1,62 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:11
+
+import unicodedata
+
+from django.db import migrations, models
+
+
+def normalizar(texto):
+    decomposto = unicodedata.normalize('NFKD', texto or '')
+    sem_acento = ''.join(c for c in decomposto if not unicodedata.combining(c))
+    return ' '.join(sem_acento.casefold().split())
+
+
+def preencher_nome_normalizado(apps, schema_editor):
+    Cliente = apps.get_model('aplicativo', 'Cliente')
+    lote = []
+    for cliente in Cliente.objects.only('id', 'nome').iterator(chunk_size=2000):
+        cliente.nome_normalizado = normalizar(cliente.nome)
+        lote.append(cliente)
+        if len(lote) >= 2000:
+            Cliente.objects.bulk_update(lote, ['nome_normalizado'])
+            lote = []
+    if lote:
+        Cliente.objects.bulk_update(lote, ['nome_normalizado'])
+
+
+def criar_indice_trigrama(apps, schema_editor):
+    # Índice GIN de trigramas para buscas "contém" (admin); só existe no Postgres
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS cliente_nome_norm_trgm '
+        'ON aplicativo_cliente USING gin (nome_normalizado gin_trgm_ops)'
+    )
+
+
+def remover_indice_trigrama(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS cliente_nome_norm_trgm')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0004_sincroniza_modelos'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='nome_normalizado',
+            field=models.CharField(blank=True, default='', editable=False, max_length=100),
+        ),
+        migrations.RunPython(preencher_nome_normalizado, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['nome_normalizado'], name='cliente_nome_norm_prefixo', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.RunPython(criar_indice_trigrama, remover_indice_trigrama),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0005_cliente_nome_normalizado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TarefaRelatorio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('inicio', models.DateField()),
+                ('fim', models.DateField()),
+                ('etag', models.CharField(db_index=True, max_length=64)),
+                ('status', models.CharField(choices=[('pendente', 'Pendente'), ('processando', 'Processando'), ('concluida', 'Concluída'), ('erro', 'Erro')], default='pendente', max_length=20)),
+                ('arquivo', models.FileField(blank=True, upload_to='relatorios/')),
+                ('erro', models.TextField(blank=True)),
+                ('criado_em', models.DateTimeField(auto_now_add=True)),
+                ('iniciado_em', models.DateTimeField(blank=True, null=True)),
+                ('concluido_em', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'criado_em'], name='tarefa_status_criado')],
+            },
+        ),
+    ]
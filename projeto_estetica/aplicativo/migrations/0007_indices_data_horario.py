@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:17
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0006_tarefarelatorio'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['data', 'horario'], include=('cliente', 'valor', 'forma_pagamento', 'tipo_pacote'), name='agenda_data_horario'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(django.db.models.functions.text.Upper('nome'), name='cliente_nome_upper'),
+        ),
+    ]
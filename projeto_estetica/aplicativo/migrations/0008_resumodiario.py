@@ -0,0 +1,65 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:20
+
+from decimal import Decimal
+
+import django.core.serializers.json
+from django.db import migrations, models
+from django.db.models import Count, Q, Sum
+
+
+def preencher_resumos(apps, schema_editor):
+    # Mesma lógica de aplicativo.resumos.reconstruir, com os models históricos
+    Painel = apps.get_model('aplicativo', 'Painel')
+    ResumoDiario = apps.get_model('aplicativo', 'ResumoDiario')
+    presente = Q(presenca=True)
+    linhas = (
+        Painel.objects
+        .values_list('agenda__data', 'agenda__forma_pagamento', 'agenda__tipo_pacote')
+        .annotate(
+            presentes=Count('id', filter=presente),
+            faltantes=Count('id', filter=~presente),
+            lucro=Sum('agenda__valor', filter=presente),
+        )
+        .order_by('agenda__data')
+    )
+
+    resumos = {}
+    for data, forma, tipo, presentes, faltantes, lucro in linhas:
+        lucro = lucro or Decimal('0')
+        resumo = resumos.setdefault(data, ResumoDiario(
+            data=data, lucro_total=Decimal('0'), por_forma_pagamento={}, por_tipo_pacote={},
+        ))
+        resumo.presentes += presentes
+        resumo.faltantes += faltantes
+        resumo.lucro_total += lucro
+        for detalhes, chave in ((resumo.por_forma_pagamento, forma), (resumo.por_tipo_pacote, tipo)):
+            grupo = detalhes.setdefault(chave or '', {'presentes': 0, 'faltantes': 0, 'lucro': '0'})
+            grupo['presentes'] += presentes
+            grupo['faltantes'] += faltantes
+            grupo['lucro'] = str(Decimal(grupo['lucro']) + lucro)
+
+    ResumoDiario.objects.bulk_create(resumos.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0007_indices_data_horario'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('data', models.DateField(unique=True)),
+                ('presentes', models.PositiveIntegerField(default=0)),
+                ('faltantes', models.PositiveIntegerField(default=0)),
+                ('lucro_total', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('por_forma_pagamento', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('por_tipo_pacote', models.JSONField(default=dict, encoder=django.core.serializers.json.DjangoJSONEncoder)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(preencher_resumos, migrations.RunPython.noop),
+    ]
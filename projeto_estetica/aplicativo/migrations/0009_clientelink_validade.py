@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:27
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0008_resumodiario'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clientelink',
+            name='arquivado',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='clientelink',
+            name='criado_em',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='clientelink',
+            name='expira_em',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='clientelink',
+            index=models.Index(fields=['arquivado', '-id'], name='clientelink_arquivado_id'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0009_clientelink_validade'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LinkRevogado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nonce', models.CharField(max_length=32, unique=True)),
+                ('expira_em', models.DateTimeField(blank=True, null=True)),
+                ('revogado_em', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
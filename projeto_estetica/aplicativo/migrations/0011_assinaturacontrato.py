@@ -0,0 +1,28 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:30
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0010_linkrevogado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AssinaturaContrato',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nonce', models.CharField(blank=True, max_length=32)),
+                ('imagem', models.FileField(upload_to='assinaturas/%Y/%m/')),
+                ('contrato', models.FileField(blank=True, upload_to='contratos/%Y/%m/')),
+                ('ip', models.GenericIPAddressField(blank=True, null=True)),
+                ('assinado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='assinaturas', to='aplicativo.cliente')),
+                ('link', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to='aplicativo.clientelink')),
+            ],
+        ),
+    ]
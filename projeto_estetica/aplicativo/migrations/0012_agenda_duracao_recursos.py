@@ -0,0 +1,56 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:31
+
+from django.db import migrations, models
+
+# Intervalo ocupado por uma agenda (data e horario não têm fuso: tsrange)
+INTERVALO = "tsrange(data + horario, data + horario + duracao * interval '1 minute')"
+
+
+def criar_restricoes(apps, schema_editor):
+    # Impede no próprio banco dois agendamentos sobrepostos com o mesmo
+    # profissional (ou sala), inclusive em gravações concorrentes. Só no
+    # Postgres; nos outros bancos vale a verificação da aplicação.
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS btree_gist')
+    for campo in ('profissional', 'sala'):
+        schema_editor.execute(
+            f"ALTER TABLE aplicativo_agenda ADD CONSTRAINT agenda_sem_conflito_{campo} "
+            f"EXCLUDE USING gist ({campo} WITH =, ({INTERVALO}) WITH &&) "
+            f"WHERE ({campo} <> '')"
+        )
+
+
+def remover_restricoes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for campo in ('profissional', 'sala'):
+        schema_editor.execute(
+            f'ALTER TABLE aplicativo_agenda DROP CONSTRAINT IF EXISTS agenda_sem_conflito_{campo}'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0011_assinaturacontrato'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agenda',
+            name='duracao',
+            field=models.PositiveSmallIntegerField(default=60, help_text='Duração em minutos'),
+        ),
+        migrations.AddField(
+            model_name='agenda',
+            name='profissional',
+            field=models.CharField(blank=True, default='', max_length=100),
+        ),
+        migrations.AddField(
+            model_name='agenda',
+            name='sala',
+            field=models.CharField(blank=True, default='', max_length=50),
+        ),
+        migrations.RunPython(criar_restricoes, remover_restricoes),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:33
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0012_agenda_duracao_recursos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Pacote',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('descricao', models.CharField(blank=True, default='', max_length=100)),
+                ('total_sessoes', models.PositiveSmallIntegerField()),
+                ('sessoes_usadas', models.PositiveSmallIntegerField(default=0)),
+                ('valor', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True)),
+                ('criado_em', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pacotes', to='aplicativo.cliente')),
+            ],
+        ),
+        migrations.AddField(
+            model_name='agenda',
+            name='pacote',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='agendas', to='aplicativo.pacote'),
+        ),
+        migrations.AddIndex(
+            model_name='pacote',
+            index=models.Index(fields=['cliente', 'criado_em'], name='pacote_cliente_criado'),
+        ),
+    ]
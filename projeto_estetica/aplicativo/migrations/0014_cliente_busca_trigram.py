@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# A busca do admin (icontains) gera UPPER(coluna::text) LIKE UPPER('%termo%');
+# um índice GIN de trigramas sobre a mesma expressão atende o LIKE com % no
+# início, que nenhum btree consegue usar.
+INDICES = {
+    'cliente_nome_trgm': 'nome',
+    'cliente_telefone_trgm': 'telefone',
+    'cliente_area_trgm': 'area',
+}
+
+
+def criar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for nome, coluna in INDICES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nome} ON aplicativo_cliente '
+            f'USING gin (UPPER({coluna}::text) gin_trgm_ops)'
+        )
+
+
+def remover_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nome in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nome}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0013_pacote'),
+    ]
+
+    operations = [
+        migrations.RunPython(criar_indices, remover_indices),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.4 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0014_cliente_busca_trigram'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='agenda',
+            index=models.Index(fields=['cliente', 'data', 'horario'], name='agenda_cliente_data'),
+        ),
+    ]
@@ -0,0 +1,58 @@
+import secrets
+
+from django.db import migrations, models
+
+
+def copiar_para_o_banco(apps, schema_editor):
+    """
+    Copia imagem e PDF do storage para a linha e sorteia o token de cada
+    assinatura. Arquivos que já se perderam (disco efêmero) ficam vazios.
+    Assinaturas repetidas do mesmo link (refresh da página) perdem a
+    referência ao link, para caber nas restrições de unicidade.
+    """
+    AssinaturaContrato = apps.get_model('aplicativo', 'AssinaturaContrato')
+    links, nonces = set(), set()
+    for assinatura in AssinaturaContrato.objects.order_by('assinado_em', 'id').iterator():
+        for campo, destino in (('imagem', 'imagem_png'), ('contrato', 'contrato_pdf')):
+            arquivo = getattr(assinatura, campo)
+            try:
+                with arquivo.open('rb') as aberto:
+                    setattr(assinatura, destino, aberto.read())
+            except (OSError, ValueError):
+                setattr(assinatura, destino, b'')
+        assinatura.token = secrets.token_urlsafe(32)
+        if assinatura.link_id in links:
+            assinatura.link_id = None
+        links.add(assinatura.link_id)
+        if assinatura.nonce in nonces:
+            assinatura.nonce = ''
+        nonces.add(assinatura.nonce)
+        assinatura.save(update_fields=['imagem_png', 'contrato_pdf', 'token', 'link', 'nonce'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0015_agenda_cliente_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assinaturacontrato',
+            name='imagem_png',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='assinaturacontrato',
+            name='contrato_pdf',
+            field=models.BinaryField(default=b''),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='assinaturacontrato',
+            name='token',
+            field=models.CharField(editable=False, max_length=64, null=True),
+        ),
+        migrations.RunPython(copiar_para_o_banco, migrations.RunPython.noop),
+    ]
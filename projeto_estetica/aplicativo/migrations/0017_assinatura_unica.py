@@ -0,0 +1,34 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separada da 0016: no Postgres, ALTER TABLE na mesma transação das
+    # atualizações de linhas (FK adiada) falha com "pending trigger events"
+
+    dependencies = [
+        ('aplicativo', '0016_assinatura_no_banco'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assinaturacontrato',
+            name='token',
+            field=models.CharField(editable=False, max_length=64, unique=True),
+        ),
+        migrations.RemoveField(
+            model_name='assinaturacontrato',
+            name='imagem',
+        ),
+        migrations.RemoveField(
+            model_name='assinaturacontrato',
+            name='contrato',
+        ),
+        migrations.AddConstraint(
+            model_name='assinaturacontrato',
+            constraint=models.UniqueConstraint(condition=models.Q(('link__isnull', False)), fields=('link',), name='assinatura_link_unica'),
+        ),
+        migrations.AddConstraint(
+            model_name='assinaturacontrato',
+            constraint=models.UniqueConstraint(condition=models.Q(('nonce', ''), _negated=True), fields=('nonce',), name='assinatura_nonce_unica'),
+        ),
+    ]
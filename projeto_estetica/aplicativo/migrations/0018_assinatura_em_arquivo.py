@@ -0,0 +1,71 @@
+import hashlib
+
+from django.core.files.base import ContentFile
+from django.db import migrations, models
+
+
+def copiar_para_o_storage(apps, schema_editor):
+    """
+    Grava imagem e PDF de cada assinatura no storage e guarda caminho e
+    SHA-256 na linha. Assinaturas sem conteúdo (arquivos perdidos antes da
+    0016) ficam sem arquivo.
+    """
+    AssinaturaContrato = apps.get_model('aplicativo', 'AssinaturaContrato')
+    for assinatura in AssinaturaContrato.objects.order_by('id').iterator():
+        for origem, campo, nome in (
+            ('imagem_png', 'imagem', f'cliente_{assinatura.cliente_id}.png'),
+            ('contrato_pdf', 'contrato', f'contrato_cliente_{assinatura.cliente_id}.pdf'),
+        ):
+            conteudo = bytes(getattr(assinatura, origem))
+            if conteudo:
+                getattr(assinatura, campo).save(nome, ContentFile(conteudo), save=False)
+                setattr(assinatura, f'{campo}_sha256', hashlib.sha256(conteudo).hexdigest())
+        assinatura.save(update_fields=['imagem', 'imagem_sha256', 'contrato', 'contrato_sha256'])
+
+
+def copiar_para_o_banco(apps, schema_editor):
+    AssinaturaContrato = apps.get_model('aplicativo', 'AssinaturaContrato')
+    for assinatura in AssinaturaContrato.objects.order_by('id').iterator():
+        for campo, destino in (('imagem', 'imagem_png'), ('contrato', 'contrato_pdf')):
+            arquivo = getattr(assinatura, campo)
+            try:
+                with arquivo.open('rb') as aberto:
+                    setattr(assinatura, destino, aberto.read())
+            except (OSError, ValueError):
+                setattr(assinatura, destino, b'')
+        assinatura.save(update_fields=['imagem_png', 'contrato_pdf'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0017_assinatura_unica'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='assinaturacontrato',
+            name='imagem',
+            field=models.FileField(default='', upload_to='assinaturas/%Y/%m/'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='assinaturacontrato',
+            name='imagem_sha256',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='assinaturacontrato',
+            name='contrato',
+            field=models.FileField(default='', upload_to='contratos/%Y/%m/'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='assinaturacontrato',
+            name='contrato_sha256',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.RunPython(copiar_para_o_storage, copiar_para_o_banco),
+    ]
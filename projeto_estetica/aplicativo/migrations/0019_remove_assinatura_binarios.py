@@ -0,0 +1,32 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separada da 0018 pelo mesmo motivo da 0017: ALTER TABLE depois de
+    # atualizar linhas na mesma transação falha no Postgres. O default só
+    # serve para a volta recriar as colunas com linhas existentes.
+
+    dependencies = [
+        ('aplicativo', '0018_assinatura_em_arquivo'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='assinaturacontrato',
+            name='imagem_png',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.AlterField(
+            model_name='assinaturacontrato',
+            name='contrato_pdf',
+            field=models.BinaryField(default=b''),
+        ),
+        migrations.RemoveField(
+            model_name='assinaturacontrato',
+            name='imagem_png',
+        ),
+        migrations.RemoveField(
+            model_name='assinaturacontrato',
+            name='contrato_pdf',
+        ),
+    ]
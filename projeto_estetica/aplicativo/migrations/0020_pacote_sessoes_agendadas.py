@@ -0,0 +1,34 @@
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def contar_agendadas(apps, schema_editor):
+    """Agendas ligadas a cada pacote ainda sem presença confirmada."""
+    Agenda = apps.get_model('aplicativo', 'Agenda')
+    Pacote = apps.get_model('aplicativo', 'Pacote')
+    agendadas = (
+        Agenda.objects
+        .filter(~Q(painel__presenca=True), pacote=OuterRef('pk'))
+        .order_by()
+        .values('pacote')
+        .annotate(total=Count('id'))
+        .values('total')
+    )
+    Pacote.objects.update(sessoes_agendadas=Coalesce(Subquery(agendadas), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('aplicativo', '0019_remove_assinatura_binarios'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pacote',
+            name='sessoes_agendadas',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(contar_agendadas, migrations.RunPython.noop),
+    ]
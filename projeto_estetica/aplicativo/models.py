@@ -1,18 +1,78 @@
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models.functions import Upper
+from django.urls import reverse
+from django.utils import timezone
 import uuid
 
+from .autocomplete import normalizar_nome
+
 class Cliente(models.Model):
     nome = models.CharField(max_length=100)
     telefone = models.CharField(max_length=20)
     area = models.CharField(max_length=100,default='Geral')
 
+    # Nome sem acentos e em minúsculas, usado nas buscas por prefixo (autocomplete)
+    nome_normalizado = models.CharField(max_length=100, blank=True, default='', editable=False)
+
+    class Meta:
+        indexes = [
+            # varchar_pattern_ops permite que o Postgres use o índice em LIKE 'abc%'
+            models.Index(
+                fields=['nome_normalizado'],
+                name='cliente_nome_norm_prefixo',
+                opclasses=['varchar_pattern_ops'],
+            ),
+            # nome__iexact (cadastro_agenda) gera UPPER(nome) = UPPER(%s)
+            models.Index(Upper('nome'), name='cliente_nome_upper'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.nome_normalizado = normalizar_nome(self.nome)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'nome' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'nome_normalizado'}
+        super().save(*args, **kwargs)
+
+    def get_absolute_url(self):
+        return reverse('perfil_cliente', args=[self.pk])
+
     def __str__(self):
         #return f"{self.nome} ({self.telefone} {self.area})"
         return f"{self.nome} ({self.telefone} {self.area})"
 
 
+class Pacote(models.Model):
+    """
+    Pacote de sessões do cliente. `sessoes_agendadas` (agendas ligadas sem
+    presença) e `sessoes_usadas` (com presença) são mantidos a cada agenda
+    ligada, apagada ou com presença alterada (ver pacotes.py), então o saldo
+    sai da própria linha; manage.py reconciliar_pacotes recalcula tudo.
+    """
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='pacotes')
+    descricao = models.CharField(max_length=100, blank=True, default='')
+    total_sessoes = models.PositiveSmallIntegerField()
+    sessoes_usadas = models.PositiveSmallIntegerField(default=0)
+    sessoes_agendadas = models.PositiveSmallIntegerField(default=0)
+    valor = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
+    criado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['cliente', 'criado_em'], name='pacote_cliente_criado'),
+        ]
+
+    @property
+    def restantes(self):
+        return max(self.total_sessoes - self.sessoes_usadas - self.sessoes_agendadas, 0)
+
+    def __str__(self):
+        return f"{self.cliente.nome}: {self.restantes} de {self.total_sessoes} restantes"
+
+
 class Agenda(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE)
+    pacote = models.ForeignKey(Pacote, on_delete=models.SET_NULL, null=True, blank=True, related_name='agendas')
     data = models.DateField()
     horario = models.TimeField()
 
@@ -22,6 +82,35 @@ class Agenda(models.Model):
     forma_pagamento = models.CharField(max_length=30, blank=True, null=True)
     valor = models.DecimalField(max_digits=10, decimal_places=2, blank=True, null=True)
 
+    # Ocupação: o atendimento vai de `horario` a `horario + duracao` minutos.
+    # Profissional/sala em branco não entram na verificação de conflitos.
+    duracao = models.PositiveSmallIntegerField(default=60, help_text="Duração em minutos")
+    profissional = models.CharField(max_length=100, blank=True, default='')
+    sala = models.CharField(max_length=50, blank=True, default='')
+
+    class Meta:
+        indexes = [
+            # Todas as telas filtram por data e ordenam por horário. No Postgres
+            # o INCLUDE cobre as colunas dos relatórios (index-only scan);
+            # nos outros bancos vira um índice simples em (data, horario).
+            models.Index(
+                fields=['data', 'horario'],
+                name='agenda_data_horario',
+                include=['cliente', 'valor', 'forma_pagamento', 'tipo_pacote'],
+            ),
+            # Histórico do cliente (historico.py), paginado por (data, horario)
+            models.Index(fields=['cliente', 'data', 'horario'], name='agenda_cliente_data'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Guarda a data carregada para invalidar também o dia antigo quando ela
+        # muda, e o pacote para mover a sessão se a agenda trocar de pacote
+        instance._data_original = instance.__dict__.get('data')
+        instance._pacote_original = instance.__dict__.get('pacote_id')
+        return instance
+
     def __str__(self):
         return f"{self.cliente.nome} - {self.data} {self.horario}"
 
@@ -29,6 +118,13 @@ class Painel(models.Model):
     agenda = models.OneToOneField(Agenda, on_delete=models.CASCADE)
     presenca = models.BooleanField(default=False, help_text="Marque se o cliente compareceu")
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Presença carregada, para saber se o saldo do pacote precisa mudar
+        instance._presenca_original = instance.__dict__.get('presenca')
+        return instance
+
     def __str__(self):
         status = "Compareceu" if self.presenca else "Faltou"
         return f"Painel: {self.agenda} - {status}"
@@ -37,6 +133,113 @@ class ClienteLink(models.Model):
     cliente = models.ForeignKey("Cliente", on_delete=models.CASCADE)
     codigo = models.CharField(max_length=50, unique=True)
     link_completo = models.CharField(max_length=255, unique=True)
+    criado_em = models.DateTimeField(default=timezone.now)
+    expira_em = models.DateTimeField(null=True, blank=True)  # None: não expira
+    arquivado = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Listagem paginada por id (decrescente) separando ativos e arquivados
+            models.Index(fields=['arquivado', '-id'], name='clientelink_arquivado_id'),
+        ]
+
+    def __str__(self):
+        return self.link_completo
+
+    @property
+    def expirado(self):
+        return self.expira_em is not None and self.expira_em <= timezone.now()
+
+
+class LinkRevogado(models.Model):
+    """Links assinados (sem linha em ClienteLink) que não valem mais, pelo nonce."""
+    nonce = models.CharField(max_length=32, unique=True)
+    expira_em = models.DateTimeField(null=True, blank=True)  # depois disso pode ser apagado
+    revogado_em = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nonce
+
+
+class AssinaturaContrato(models.Model):
+    """
+    Assinatura feita pelo cliente no link do contrato. A imagem (PNG de 1 bit,
+    recortada, poucos KB) e o PDF do contrato ficam no STORAGES['default']
+    (ver ARQUIVOS_STORAGE); a linha guarda o caminho e o SHA-256 de cada
+    arquivo. Cada link aceita uma assinatura.
+    """
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='assinaturas')
+    # Link salvo (ClienteLink) ou nonce do link assinado usado na assinatura
+    link = models.ForeignKey(ClienteLink, on_delete=models.SET_NULL, null=True, blank=True)
+    nonce = models.CharField(max_length=32, blank=True)
+    # Chave aleatória do download do contrato pelo cliente
+    token = models.CharField(max_length=64, unique=True, editable=False)
+    imagem = models.FileField(upload_to='assinaturas/%Y/%m/')
+    imagem_sha256 = models.CharField(max_length=64)
+    contrato = models.FileField(upload_to='contratos/%Y/%m/')
+    contrato_sha256 = models.CharField(max_length=64)
+    ip = models.GenericIPAddressField(null=True, blank=True)
+    assinado_em = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['link'], condition=models.Q(link__isnull=False), name='assinatura_link_unica',
+            ),
+            models.UniqueConstraint(
+                fields=['nonce'], condition=~models.Q(nonce=''), name='assinatura_nonce_unica',
+            ),
+        ]
+
+    def __str__(self):
+        return f"Assinatura de {self.cliente_id} em {self.assinado_em:%d/%m/%Y %H:%M}"
+
+
+class TarefaRelatorio(models.Model):
+    """Exportação de PDF enfileirada para o worker (manage.py processar_relatorios)."""
+
+    PENDENTE = 'pendente'
+    PROCESSANDO = 'processando'
+    CONCLUIDA = 'concluida'
+    ERRO = 'erro'
+    STATUS_CHOICES = [
+        (PENDENTE, 'Pendente'),
+        (PROCESSANDO, 'Processando'),
+        (CONCLUIDA, 'Concluída'),
+        (ERRO, 'Erro'),
+    ]
+
+    inicio = models.DateField()
+    fim = models.DateField()
+    # Versão do conteúdo do período no momento do pedido (ver versoes.py)
+    etag = models.CharField(max_length=64, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=PENDENTE)
+    arquivo = models.FileField(upload_to='relatorios/', blank=True)
+    erro = models.TextField(blank=True)
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(blank=True, null=True)
+    concluido_em = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'criado_em'], name='tarefa_status_criado'),
+        ]
+
+    def __str__(self):
+        return f"Relatório {self.inicio} a {self.fim} - {self.get_status_display()}"
+
+
+class ResumoDiario(models.Model):
+    """Totais de um dia, mantidos a cada gravação de Agenda/Painel (ver resumos.py)."""
+
+    data = models.DateField(unique=True)
+    presentes = models.PositiveIntegerField(default=0)
+    faltantes = models.PositiveIntegerField(default=0)
+    lucro_total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    # {"pix": {"presentes": 3, "faltantes": 1, "lucro": "150.00"}, ...}
+    por_forma_pagamento = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    por_tipo_pacote = models.JSONField(default=dict, encoder=DjangoJSONEncoder)
+    atualizado_em = models.DateTimeField(auto_now=True)
 
     def __str__(self):
-        return self.link_completo
\ No newline at end of file
+        return f"Resumo {self.data}: {self.presentes} presentes, {self.faltantes} faltantes"
@@ -0,0 +1,53 @@
+"""
+Orçamento de consultas por view.
+
+Cada view pode declarar quantas consultas SQL pode fazer por requisição com
+@orcamento_consultas(n). O MetricasMiddleware avisa no log quando uma
+requisição passa do orçamento, e assertDentroDoOrcamento (OrcamentoMixin,
+para os TestCase do projeto) falha listando as consultas feitas, para que um
+N+1 novo apareça nos testes e não em produção (aplicativo/tests.py chama
+cada view decorada). A contagem inclui os SAVEPOINTs e, no Postgres, o
+pg_advisory_xact_lock do resumo diário de cada dia gravado.
+"""
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve
+
+
+def orcamento_consultas(maximo):
+    """Declara o máximo de consultas SQL que a view pode fazer por requisição."""
+    def decorador(view):
+        view.orcamento_consultas = maximo
+        return view
+    return decorador
+
+
+def orcamento_da_view(view):
+    return getattr(view, 'orcamento_consultas', None)
+
+
+class OrcamentoMixin:
+    """Mixin para django.test.TestCase com a verificação de orçamento."""
+
+    def assertDentroDoOrcamento(self, url, metodo='get', dados=None, maximo=None, using='default'):
+        """
+        Faz a requisição e falha se ela usar mais consultas que o orçamento
+        declarado na view (ou `maximo`, se informado). Retorna a resposta.
+        """
+        if maximo is None:
+            maximo = orcamento_da_view(resolve(url.split('?')[0]).func)
+            if maximo is None:
+                self.fail(f"A view de {url} não declara @orcamento_consultas.")
+
+        with CaptureQueriesContext(connections[using]) as consultas:
+            resposta = getattr(self.client, metodo)(url, dados or {})
+
+        if len(consultas) > maximo:
+            detalhes = '\n'.join(
+                f"{numero}. {consulta['sql']}"
+                for numero, consulta in enumerate(consultas.captured_queries, start=1)
+            )
+            self.fail(
+                f"{url} fez {len(consultas)} consultas; o orçamento é {maximo}.\n{detalhes}"
+            )
+        return resposta
@@ -0,0 +1,180 @@
+"""
+Saldo dos pacotes de sessões.
+
+Cada agenda ligada a um pacote ocupa uma sessão dele: em `sessoes_agendadas`
+enquanto não tem presença confirmada e em `sessoes_usadas` depois. Os dois
+contadores são mantidos com UPDATE ... SET campo = campo ± n ao agendar,
+cancelar, mudar a agenda de pacote e marcar/desmarcar presença, então o
+saldo sai só da linha do pacote e nunca é recalculado a partir do histórico.
+reconciliar() refaz as contagens se algo sair do lugar.
+
+Um pacote de 10 sessões com 10 marcadas não recebe a 11ª. Uma falta continua
+ocupando a sessão até a agenda ser apagada ou ir para outro pacote.
+"""
+from collections import Counter, defaultdict
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+
+from . import autocomplete
+from .models import Agenda, Pacote, Painel
+
+# Sessões livres: a mesma expressão escolhe o pacote e aparece na tela
+RESTANTES = F('total_sessoes') - F('sessoes_usadas') - F('sessoes_agendadas')
+
+
+def _com_saldo(pacotes):
+    return pacotes.annotate(saldo=RESTANTES).filter(saldo__gt=0).order_by('criado_em', 'id')
+
+
+def pacote_atual(cliente_id):
+    """Pacote mais antigo do cliente com sessões ainda não usadas nem agendadas."""
+    return _com_saldo(Pacote.objects.filter(cliente_id=cliente_id)).first()
+
+
+def _pacote_novo(agenda):
+    """Pacote aberto pela agenda quando ela informa a quantidade de sessões."""
+    quantidade = (agenda.quantidade_pacote or '').strip()
+    if quantidade.isdigit() and int(quantidade) > 0:
+        return Pacote.objects.create(
+            cliente_id=agenda.cliente_id,
+            total_sessoes=int(quantidade),
+            valor=agenda.valor,
+        )
+    return None
+
+
+def vincular(agenda):
+    """
+    Liga a agenda (ainda não salva, com cliente) ao pacote em uso. Se o
+    cliente não tem pacote com saldo e a agenda informa a quantidade de
+    sessões, um pacote novo é aberto com essa quantidade e o valor da agenda.
+    O contador do pacote muda no post_save da agenda (signals.py).
+    """
+    if agenda.tipo_pacote != 'pacote' or agenda.pacote_id:
+        return
+    agenda.pacote = pacote_atual(agenda.cliente_id) or _pacote_novo(agenda)
+
+
+def vincular_lote(agendas):
+    """
+    vincular() para agendas que vão entrar via bulk_create (sem sinais): uma
+    consulta para os pacotes com saldo de todos os clientes do lote e um
+    UPDATE por pacote que recebeu agendas.
+    """
+    pendentes = [agenda for agenda in agendas if agenda.tipo_pacote == 'pacote' and not agenda.pacote_id]
+    if not pendentes:
+        return
+
+    livres = defaultdict(list)
+    consulta = _com_saldo(Pacote.objects.filter(cliente_id__in={agenda.cliente_id for agenda in pendentes}))
+    for pacote in consulta:
+        livres[pacote.cliente_id].append([pacote, pacote.saldo])
+
+    agendadas = Counter()
+    for agenda in pendentes:
+        fila = livres[agenda.cliente_id]
+        while fila and fila[0][1] == 0:
+            fila.pop(0)
+        if not fila:
+            pacote = _pacote_novo(agenda)
+            if pacote is None:
+                continue
+            fila.append([pacote, pacote.total_sessoes])
+        fila[0][1] -= 1
+        agenda.pacote = fila[0][0]
+        agendadas[agenda.pacote.pk] += 1
+
+    for pacote_id, quantidade in agendadas.items():
+        Pacote.objects.filter(pk=pacote_id).update(sessoes_agendadas=F('sessoes_agendadas') + quantidade)
+    if agendadas:
+        autocomplete.invalidar_cache()
+
+
+def mover_agenda(agenda_id, de, para, presente=None):
+    """
+    Passa a sessão ocupada pela agenda do pacote `de` para o `para` (qualquer
+    um pode ser None: agenda nova ou apagada). `presente` evita consultar o
+    painel quando já se sabe a presença.
+    """
+    if de == para:
+        return
+    if presente is None:
+        presente = Painel.objects.filter(agenda_id=agenda_id, presenca=True).exists()
+    campo = 'sessoes_usadas' if presente else 'sessoes_agendadas'
+    if de:
+        Pacote.objects.filter(pk=de).update(**{campo: Greatest(F(campo) - 1, Value(0))})
+    if para:
+        Pacote.objects.filter(pk=para).update(**{campo: F(campo) + 1})
+    autocomplete.invalidar_cache()
+
+
+def aplicar_presencas(mudancas):
+    """
+    mudancas: pares (pacote_id, presenca_nova) de presenças que mudaram.
+    Um UPDATE por pacote afetado, passando sessões de agendadas para usadas
+    (ou de volta).
+    """
+    saldo = Counter()
+    for pacote_id, presenca in mudancas:
+        if pacote_id:
+            saldo[pacote_id] += 1 if presenca else -1
+    alterados = False
+    for pacote_id, delta in saldo.items():
+        if delta:
+            Pacote.objects.filter(pk=pacote_id).update(
+                sessoes_usadas=Greatest(F('sessoes_usadas') + delta, Value(0)),
+                sessoes_agendadas=Greatest(F('sessoes_agendadas') - delta, Value(0)),
+            )
+            alterados = True
+    if alterados:
+        # O saldo aparece no autocomplete do cadastro
+        autocomplete.invalidar_cache()
+
+
+def anotar_saldo(clientes):
+    """
+    Acrescenta pacote_total/pacote_restantes do pacote atual a um queryset de
+    clientes; cada subconsulta lê só a linha do pacote (índice por cliente).
+    """
+    atual = _com_saldo(Pacote.objects.filter(cliente=OuterRef('pk')))
+    return clientes.annotate(
+        pacote_total=Subquery(atual.values('total_sessoes')[:1]),
+        pacote_restantes=Subquery(atual.values('saldo')[:1]),
+    )
+
+
+def descrever_saldo(total, restantes):
+    if total is None:
+        return ''
+    return f"{restantes} de {total} restantes"
+
+
+def _contagem(filtro):
+    return Coalesce(
+        Subquery(
+            Agenda.objects
+            .filter(filtro, pacote=OuterRef('pk'))
+            .order_by()
+            .values('pacote')
+            .annotate(total=Count('id'))
+            .values('total')
+        ),
+        Value(0),
+    )
+
+
+def reconciliar():
+    """Recalcula sessões usadas e agendadas de todos os pacotes. Retorna quantos mudaram."""
+    usadas = _contagem(Q(painel__presenca=True))
+    agendadas = _contagem(~Q(painel__presenca=True))
+    divergentes = (
+        Pacote.objects
+        .annotate(usadas_corretas=usadas, agendadas_corretas=agendadas)
+        .filter(~Q(sessoes_usadas=F('usadas_corretas')) | ~Q(sessoes_agendadas=F('agendadas_corretas')))
+    )
+    ids = list(divergentes.values_list('id', flat=True))
+    if ids:
+        Pacote.objects.filter(pk__in=ids).update(sessoes_usadas=usadas, sessoes_agendadas=agendadas)
+        autocomplete.invalidar_cache()
+    return len(ids)
@@ -0,0 +1,91 @@
+"""
+Consultas de resumo (presença e faturamento) feitas no banco.
+
+O resumo de um dia sai de agregações condicionais (Count/Sum com filter=)
+sobre as agendas do dia. Os resumos de período leem a tabela ResumoDiario,
+uma linha por dia, então o custo depende do número de dias e não do número
+de agendas.
+"""
+from decimal import Decimal
+
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Painel, ResumoDiario
+from .resumos import PRESENTE, mesclar_grupos
+
+TOTAIS = {
+    'presentes': Count('id', filter=PRESENTE),
+    'faltantes': Count('id', filter=~PRESENTE),
+    'lucro_total': Sum('agenda__valor', filter=PRESENTE),
+}
+
+# Agrupamentos aceitos no resumo de período
+AGRUPAMENTOS = ('dia', 'mes', 'forma_pagamento', 'tipo_pacote')
+
+
+def _sem_nulos(totais):
+    totais['lucro_total'] = totais['lucro_total'] or Decimal('0')
+    return totais
+
+
+def totais_dia(data):
+    """Presentes, faltantes e lucro do dia (uma consulta)."""
+    return _sem_nulos(Painel.objects.filter(agenda__data=data).aggregate(**TOTAIS))
+
+
+def resumo_dia(data):
+    """Totais do dia e os nomes de presentes/faltantes (duas consultas)."""
+    paineis = Painel.objects.filter(agenda__data=data)
+    totais = totais_dia(data)
+
+    nomes_presentes = []
+    nomes_faltantes = []
+    for nome, presenca in paineis.order_by('agenda__horario').values_list('agenda__cliente__nome', 'presenca'):
+        (nomes_presentes if presenca else nomes_faltantes).append(nome)
+
+    totais['nomes_presentes'] = nomes_presentes
+    totais['nomes_faltantes'] = nomes_faltantes
+    return totais
+
+
+def resumo_periodo(inicio, fim, agrupar='dia'):
+    """
+    Uma linha por grupo (dia, mês, forma de pagamento ou tipo de pacote) com
+    presentes, faltantes e lucro, a partir de ResumoDiario (uma consulta).
+    """
+    resumos = ResumoDiario.objects.filter(data__range=(inicio, fim))
+
+    if agrupar == 'dia':
+        return list(
+            resumos.order_by('data')
+            .values('presentes', 'faltantes', 'lucro_total', grupo=F('data'))
+        )
+
+    if agrupar == 'mes':
+        return list(
+            resumos
+            .annotate(grupo=TruncMonth('data'))
+            .values('grupo')
+            .annotate(
+                presentes=Sum('presentes'),
+                faltantes=Sum('faltantes'),
+                lucro_total=Sum('lucro_total'),
+            )
+            .order_by('grupo')
+        )
+
+    grupos = mesclar_grupos(resumos, f'por_{agrupar}')
+    return [
+        {'grupo': chave or None, **grupos[chave]}
+        for chave in sorted(grupos)
+    ]
+
+
+def somar(linhas):
+    """Total geral a partir das linhas já agregadas (poucas, uma por grupo)."""
+    return {
+        'presentes': sum(linha['presentes'] for linha in linhas),
+        'faltantes': sum(linha['faltantes'] for linha in linhas),
+        'lucro_total': sum((linha['lucro_total'] for linha in linhas), Decimal('0')),
+    }
@@ -0,0 +1,254 @@
+import time
+from contextlib import contextmanager
+from tempfile import SpooledTemporaryFile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.html import escape
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import A4, landscape
+from reportlab.lib.styles import ParagraphStyle
+from reportlab.lib.units import cm
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Paragraph, Table, TableStyle
+
+from . import telemetria, versoes
+from .models import Agenda
+
+TAMANHO_PAGINA = landscape(A4)
+MARGEM = 1.5 * cm
+TAMANHO_LOTE = 2000
+
+# Acima disso o PDF vai para um arquivo temporário em disco em vez da memória
+LIMITE_MEMORIA_PDF = 5 * 1024 * 1024
+
+CABECALHO = [
+    "Nome", "Telefone", "Data", "Horário", "Tipo", "Qtde", "Área", "Forma Pagamento", "Valor"
+]
+# Larguras fixas para que as colunas fiquem iguais em todas as páginas
+LARGURAS = [170, 90, 65, 50, 65, 45, 110, 95, 68]
+
+# Padding das células; entra na medição da altura de cada linha
+PADDING_HORIZONTAL = 6
+PADDING_VERTICAL = 3
+PADDING_CABECALHO = 12
+
+# Espaço vertical da página para a tabela: abaixo do título, acima do rodapé
+ALTURA_TABELA = TAMANHO_PAGINA[1] - 2 * MARGEM - 16 - 1 * cm
+
+# Textos longos quebram linha dentro da coluna em vez de invadir a vizinha
+ESTILO_CELULA = ParagraphStyle('celula', fontName='Helvetica', fontSize=9, leading=11, alignment=TA_CENTER)
+ESTILO_CABECALHO = ParagraphStyle(
+    'cabecalho', parent=ESTILO_CELULA, fontName='Helvetica-Bold', textColor=colors.whitesmoke,
+)
+
+ESTILO_TABELA = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
+    ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ('LEFTPADDING', (0, 0), (-1, -1), PADDING_HORIZONTAL),
+    ('RIGHTPADDING', (0, 0), (-1, -1), PADDING_HORIZONTAL),
+    ('TOPPADDING', (0, 0), (-1, -1), PADDING_VERTICAL),
+    ('BOTTOMPADDING', (0, 1), (-1, -1), PADDING_VERTICAL),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), PADDING_CABECALHO),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f2f2f2")])
+])
+
+COLUNAS = (
+    'id', 'data', 'horario',
+    'cliente__nome', 'cliente__telefone', 'cliente__area',
+    'tipo_pacote', 'quantidade_pacote', 'forma_pagamento', 'valor',
+)
+
+
+class Cronometro:
+    """Acumula o tempo gasto em cada etapa (em ms) para a telemetria da exportação."""
+
+    def __init__(self):
+        self.tempos = {}
+
+    @contextmanager
+    def medir(self, etapa):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            gasto = (time.perf_counter() - inicio) * 1000
+            self.tempos[etapa] = self.tempos.get(etapa, 0.0) + gasto
+
+
+def titulo_periodo(inicio, fim):
+    if inicio == fim:
+        return f"Clientes do dia - {inicio.strftime('%d/%m/%Y')}"
+    return f"Clientes de {inicio.strftime('%d/%m/%Y')} a {fim.strftime('%d/%m/%Y')}"
+
+
+def nome_arquivo(inicio, fim):
+    if inicio == fim:
+        return f"clientes_{inicio}.pdf"
+    return f"clientes_{inicio}_a_{fim}.pdf"
+
+
+def linhas_periodo(inicio, fim, cronometro, tamanho_lote=TAMANHO_LOTE):
+    """
+    Percorre as agendas do período em lotes, paginando por (data, horario, id).
+
+    A paginação por chave substitui um cursor no servidor: a conexão passa
+    pelo pooler do Supabase em modo transação, onde cursores nomeados não
+    sobrevivem entre comandos. Cada lote é lido com .iterator() e descartado
+    antes do próximo, então a memória não cresce com o tamanho do período.
+    """
+    base = (
+        Agenda.objects
+        .filter(data__range=(inicio, fim))
+        .order_by('data', 'horario', 'id')
+        .values_list(*COLUNAS)
+    )
+    ultimo = None
+    while True:
+        consulta = base
+        if ultimo is not None:
+            data, horario, pk = ultimo
+            consulta = consulta.filter(
+                Q(data__gt=data)
+                | Q(data=data, horario__gt=horario)
+                | Q(data=data, horario=horario, id__gt=pk)
+            )
+        with cronometro.medir('consulta'):
+            lote = list(consulta[:tamanho_lote].iterator())
+        yield from lote
+        if len(lote) < tamanho_lote:
+            return
+        pk, data, horario = lote[-1][:3]
+        ultimo = (data, horario, pk)
+
+
+def _formatar(linha):
+    _, data, horario, nome, telefone, area, tipo, quantidade, pagamento, valor = linha
+    return [
+        nome or "",
+        telefone or "",
+        data.strftime('%d/%m/%Y'),
+        horario.strftime('%H:%M') if horario else "",
+        tipo or "",
+        quantidade or "",
+        area or "",
+        pagamento or "",
+        f"R$ {valor:.2f}" if valor is not None else "",
+    ]
+
+
+def _celulas(textos, estilo=ESTILO_CELULA):
+    """
+    Converte os textos da linha em Paragraph e devolve (células, altura da
+    linha). Texto que cabe na coluna ocupa uma linha só; os demais são
+    medidos com wrap, que é a mesma conta que a Table faz ao desenhar.
+    """
+    celulas = []
+    altura = estilo.leading
+    for texto, largura in zip(textos, LARGURAS):
+        texto = str(texto)
+        paragrafo = Paragraph(escape(texto), estilo)
+        util = largura - 2 * PADDING_HORIZONTAL
+        if stringWidth(texto, estilo.fontName, estilo.fontSize) > util:
+            altura = max(altura, paragrafo.wrap(util, ALTURA_TABELA)[1])
+        celulas.append(paragrafo)
+    return celulas, altura
+
+
+CELULAS_CABECALHO, _ALTURA_CABECALHO = _celulas(CABECALHO, ESTILO_CABECALHO)
+ALTURA_CABECALHO = _ALTURA_CABECALHO + PADDING_VERTICAL + PADDING_CABECALHO
+
+
+def _desenhar_pagina(pdf, titulo, numero, linhas):
+    largura, altura = TAMANHO_PAGINA
+    pdf.setFont('Helvetica', 16)
+    pdf.drawCentredString(largura / 2, altura - MARGEM - 16, titulo)
+
+    tabela = Table([CELULAS_CABECALHO] + linhas, colWidths=LARGURAS)
+    tabela.setStyle(ESTILO_TABELA)
+    _, altura_tabela = tabela.wrapOn(pdf, largura - 2 * MARGEM, altura)
+    tabela.drawOn(pdf, MARGEM, altura - MARGEM - 16 - 1 * cm - altura_tabela)
+
+    pdf.setFont('Helvetica', 8)
+    pdf.drawRightString(largura - MARGEM, MARGEM / 2, f"Página {numero}")
+    pdf.showPage()
+
+
+def gerar_pdf(inicio, fim, destino):
+    """
+    Escreve em `destino` (arquivo ou objeto file-like) o PDF das agendas
+    entre `inicio` e `fim`. Cada página é uma tabela própria com as linhas
+    que cabem em ALTURA_TABELA (a altura de cada linha é medida depois da
+    quebra de texto), então nunca existe uma tabela com o período inteiro em
+    memória. Retorna (quantidade de linhas, Cronometro).
+    """
+    comeco = time.perf_counter()
+    cronometro = Cronometro()
+    titulo = titulo_periodo(inicio, fim)
+    pdf = canvas.Canvas(destino, pagesize=TAMANHO_PAGINA)
+    pdf.setTitle(titulo)
+
+    total = 0
+    pagina = []
+    ocupado = ALTURA_CABECALHO
+    numero = 1
+    for linha in linhas_periodo(inicio, fim, cronometro):
+        celulas, altura = _celulas(_formatar(linha))
+        altura += 2 * PADDING_VERTICAL
+        if pagina and ocupado + altura > ALTURA_TABELA:
+            with cronometro.medir('render'):
+                _desenhar_pagina(pdf, titulo, numero, pagina)
+            pagina = []
+            ocupado = ALTURA_CABECALHO
+            numero += 1
+        pagina.append(celulas)
+        ocupado += altura
+        total += 1
+
+    with cronometro.medir('render'):
+        if pagina or total == 0:
+            _desenhar_pagina(pdf, titulo, numero, pagina)
+        pdf.save()
+    cronometro.tempos['total'] = (time.perf_counter() - comeco) * 1000
+
+    return total, cronometro
+
+
+def gerar_pdf_temporario(inicio, fim):
+    """Gera o PDF num SpooledTemporaryFile já posicionado no início."""
+    arquivo = SpooledTemporaryFile(max_size=LIMITE_MEMORIA_PDF)
+    try:
+        total, cronometro = gerar_pdf(inicio, fim, arquivo)
+    except Exception:
+        arquivo.close()
+        telemetria.registrar_erro('request', inicio=inicio, fim=fim)
+        raise
+    telemetria.registrar_exportacao('request', cronometro, total, arquivo.tell(), inicio=inicio, fim=fim)
+    arquivo.seek(0)
+    return arquivo
+
+
+def etag_pdf(inicio, fim):
+    return versoes.etag_periodo('pdf', inicio, fim)
+
+
+def _chave_pdf(etag):
+    return f'relatorio:pdf:{etag}'
+
+
+def pdf_em_cache(etag):
+    return cache.get(_chave_pdf(etag))
+
+
+def cabe_no_cache(tamanho):
+    """PDFs muito grandes (períodos longos) são servidos direto do disco."""
+    return tamanho <= getattr(settings, 'RELATORIO_PDF_CACHE_MAX_BYTES', 10 * 1024 * 1024)
+
+
+def guardar_pdf(etag, conteudo):
+    timeout = getattr(settings, 'RELATORIO_PDF_CACHE_TIMEOUT', 24 * 60 * 60)
+    cache.set(_chave_pdf(etag), conteudo, timeout)
@@ -0,0 +1,131 @@
+"""
+Manutenção da tabela ResumoDiario.
+
+Sempre que uma agenda ou presença muda, só o dia afetado é recalculado, com
+uma consulta agregada sobre as agendas daquele dia; os relatórios de período
+leem uma linha por dia em vez de percorrer todas as agendas. O recálculo é
+idempotente, então gravações repetidas não acumulam erro. No Postgres cada
+dia é travado (advisory lock da transação) antes da agregação: dois
+recálculos simultâneos do mesmo dia rodam um depois do outro, e o segundo
+já lê o que o primeiro gravou.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Painel, ResumoDiario
+
+PRESENTE = Q(presenca=True)
+
+COLUNAS_GRUPO = ('agenda__data', 'agenda__forma_pagamento', 'agenda__tipo_pacote')
+
+# Primeira chave dos advisory locks de recalcular_dias (a segunda é o dia)
+TRAVA_RESUMO = 7001
+
+
+def _linhas_agrupadas(paineis):
+    """Uma linha por (dia, forma de pagamento, tipo de pacote)."""
+    return (
+        paineis
+        .values_list(*COLUNAS_GRUPO)
+        .annotate(
+            presentes=Count('id', filter=PRESENTE),
+            faltantes=Count('id', filter=~PRESENTE),
+            lucro=Sum('agenda__valor', filter=PRESENTE),
+        )
+        .order_by(*COLUNAS_GRUPO)
+    )
+
+
+def _somar_em(destino, chave, presentes, faltantes, lucro):
+    grupo = destino.setdefault(chave or '', {'presentes': 0, 'faltantes': 0, 'lucro': '0'})
+    grupo['presentes'] += presentes
+    grupo['faltantes'] += faltantes
+    grupo['lucro'] = str(Decimal(grupo['lucro']) + lucro)
+
+
+def _montar_resumos(linhas):
+    """Converte as linhas agrupadas em instâncias (não salvas) de ResumoDiario."""
+    resumos = {}
+    for data, forma, tipo, presentes, faltantes, lucro in linhas:
+        lucro = lucro or Decimal('0')
+        resumo = resumos.get(data)
+        if resumo is None:
+            resumo = resumos[data] = ResumoDiario(
+                data=data, lucro_total=Decimal('0'),
+                por_forma_pagamento={}, por_tipo_pacote={},
+            )
+        resumo.presentes += presentes
+        resumo.faltantes += faltantes
+        resumo.lucro_total += lucro
+        _somar_em(resumo.por_forma_pagamento, forma, presentes, faltantes, lucro)
+        _somar_em(resumo.por_tipo_pacote, tipo, presentes, faltantes, lucro)
+    return resumos
+
+
+def recalcular_dias(*dias):
+    """Refaz o resumo dos dias informados (ignora None e repetidos)."""
+    dias = {dia for dia in dias if dia}
+    if not dias:
+        return
+    with transaction.atomic():
+        _travar_dias(dias)
+        linhas = _linhas_agrupadas(Painel.objects.filter(agenda__data__in=dias))
+        resumos = _montar_resumos(linhas)
+        for dia in dias:
+            resumo = resumos.get(dia)
+            if resumo is None:
+                ResumoDiario.objects.filter(data=dia).delete()
+                continue
+            ResumoDiario.objects.update_or_create(data=dia, defaults={
+                'presentes': resumo.presentes,
+                'faltantes': resumo.faltantes,
+                'lucro_total': resumo.lucro_total,
+                'por_forma_pagamento': resumo.por_forma_pagamento,
+                'por_tipo_pacote': resumo.por_tipo_pacote,
+            })
+
+
+def _travar_dias(dias):
+    # Liberado no commit/rollback. Em ordem, para não haver deadlock entre
+    # gravações que tocam vários dias. No SQLite as escritas já são serializadas.
+    if connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        for dia in sorted(dias):
+            cursor.execute('SELECT pg_advisory_xact_lock(%s, %s)', [TRAVA_RESUMO, dia.toordinal()])
+
+
+def reconstruir(inicio=None, fim=None, tamanho_lote=1000):
+    """
+    Recria os resumos a partir das agendas (backfill ou correção), numa
+    única consulta agrupada por dia. Retorna quantos dias foram gravados.
+    """
+    paineis = Painel.objects.all()
+    existentes = ResumoDiario.objects.all()
+    if inicio:
+        paineis = paineis.filter(agenda__data__gte=inicio)
+        existentes = existentes.filter(data__gte=inicio)
+    if fim:
+        paineis = paineis.filter(agenda__data__lte=fim)
+        existentes = existentes.filter(data__lte=fim)
+
+    resumos = _montar_resumos(_linhas_agrupadas(paineis))
+    with transaction.atomic():
+        existentes.delete()
+        ResumoDiario.objects.bulk_create(resumos.values(), batch_size=tamanho_lote)
+    return len(resumos)
+
+
+def mesclar_grupos(resumos, campo):
+    """Soma o detalhamento (por forma de pagamento ou tipo de pacote) de vários dias."""
+    total = defaultdict(lambda: {'presentes': 0, 'faltantes': 0, 'lucro_total': Decimal('0')})
+    for detalhes in resumos.values_list(campo, flat=True):
+        for chave, valores in detalhes.items():
+            grupo = total[chave]
+            grupo['presentes'] += valores['presentes']
+            grupo['faltantes'] += valores['faltantes']
+            grupo['lucro_total'] += Decimal(valores['lucro'])
+    return total
@@ -0,0 +1,192 @@
+"""
+Regras de gravação de agendas (cadastro, edição e importação em lote).
+
+Cada operação roda numa transação: cliente, agenda e painel são gravados
+juntos ou nada é gravado. O cliente só é reescrito quando algum campo mudou,
+e apenas nas colunas que mudaram.
+"""
+from contextlib import contextmanager
+
+from django.db import IntegrityError, transaction
+
+from . import autocomplete, pacotes, versoes
+from .autocomplete import normalizar_nome
+from .models import Agenda, Cliente, Painel
+from .signals import dias_adiados, dias_alterados
+
+CAMPOS_AGENDA = (
+    'data', 'horario', 'tipo_pacote', 'quantidade_pacote', 'forma_pagamento', 'valor',
+    'duracao', 'profissional', 'sala',
+)
+TAMANHO_LOTE = 1000
+
+
+class ConflitoHorario(Exception):
+    pass
+
+
+@contextmanager
+def _sem_conflito():
+    """
+    Converte a violação das exclusion constraints do Postgres (gravação
+    concorrente que passou pela verificação do formulário) em ConflitoHorario.
+    """
+    try:
+        yield
+    except IntegrityError as e:
+        if 'agenda_sem_conflito' not in str(e):
+            raise
+        raise ConflitoHorario(
+            "Outro agendamento acabou de ocupar este horário com o mesmo profissional ou sala."
+        ) from e
+
+
+def atualizar_cliente(cliente, **campos):
+    """Grava só os campos que mudaram. Retorna True se houve gravação."""
+    alterados = [nome for nome, valor in campos.items() if getattr(cliente, nome) != valor]
+    if not alterados:
+        return False
+    for nome in alterados:
+        setattr(cliente, nome, campos[nome])
+    cliente.save(update_fields=alterados)
+    return True
+
+
+def buscar_ou_criar_cliente(nome, telefone, area):
+    """Busca o cliente pelo nome sem diferenciar maiúsculas, como no cadastro."""
+    cliente = Cliente.objects.filter(nome__iexact=nome).first()
+    if cliente:
+        atualizar_cliente(cliente, telefone=telefone, area=area)
+    else:
+        cliente = Cliente.objects.create(nome=nome, telefone=telefone, area=area)
+    return cliente
+
+
+def agendar(nome, telefone, area, agenda):
+    """Cadastra a agenda (ainda não salva) com seu cliente e painel."""
+    with _sem_conflito(), dias_adiados(), transaction.atomic():
+        agenda.cliente = buscar_ou_criar_cliente(nome, telefone, area)
+        pacotes.vincular(agenda)
+        agenda.save()
+        Painel.objects.create(agenda=agenda)
+    return agenda
+
+
+def atualizar_agenda(agenda, nome, telefone, area):
+    """Salva a edição de uma agenda existente e os dados do cliente dela."""
+    with _sem_conflito(), dias_adiados(), transaction.atomic():
+        atualizar_cliente(agenda.cliente, nome=nome, telefone=telefone, area=area)
+        pacotes.vincular(agenda)
+        agenda.save()
+        Painel.objects.get_or_create(agenda=agenda)
+    return agenda
+
+
+def _clientes_existentes(chaves):
+    """
+    Clientes cujo nome em maiúsculas está em `chaves`. A busca vai pelo
+    índice de nome_normalizado (que já ignora caixa e acentos) e a
+    comparação exata é feita aqui, igual ao UPPER() do nome__iexact no
+    Postgres, inclusive para letras acentuadas.
+    """
+    encontrados = {}
+    normalizados = list({normalizar_nome(chave) for chave in chaves})
+    for i in range(0, len(normalizados), TAMANHO_LOTE):
+        consulta = (
+            Cliente.objects
+            .filter(nome_normalizado__in=normalizados[i:i + TAMANHO_LOTE])
+            .order_by('id')
+        )
+        for cliente in consulta:
+            chave = cliente.nome.upper()
+            # Mantém o mais antigo, como o .first() do cadastro individual
+            if chave in chaves:
+                encontrados.setdefault(chave, cliente)
+    return encontrados
+
+
+def agendar_em_lote(reservas, tamanho_lote=TAMANHO_LOTE, clientes=None):
+    """
+    Grava várias reservas de uma vez. Cada reserva é um dict com os campos do
+    AgendaForm (nome, telefone, area, data, horario, ...). Clientes repetidos
+    no lote são resolvidos uma vez só: a primeira ocorrência define telefone
+    e área, e as seguintes não sobrescrevem. Clientes, agendas e painéis
+    entram via bulk_create/bulk_update.
+
+    `clientes` (nome em maiúsculas -> Cliente) pode ser passado entre
+    chamadas sucessivas, como na importação de planilhas, para que cada
+    cliente seja buscado no banco (e atualizado) uma vez só; os que já estão
+    nele vêm de uma chamada anterior e não são reescritos. Retorna as
+    quantidades gravadas.
+    """
+    if clientes is None:
+        clientes = {}
+    dados_clientes = {}
+    for reserva in reservas:
+        dados_clientes.setdefault(reserva['nome'].upper(), reserva)
+
+    try:
+        with _sem_conflito(), transaction.atomic():
+            resumo, agendas = _gravar_lote(reservas, dados_clientes, clientes, tamanho_lote)
+    except Exception:
+        # Os clientes deste lote podem ter ids de uma transação desfeita
+        for chave in dados_clientes:
+            clientes.pop(chave, None)
+        raise
+
+    # Operações em lote não disparam sinais
+    dias_alterados(*{agenda.data for agenda in agendas})
+    if resumo['clientes_novos'] or resumo['clientes_atualizados']:
+        autocomplete.invalidar_cache()
+    if resumo['clientes_atualizados']:
+        versoes.invalidar_clientes()
+    return resumo
+
+
+def _gravar_lote(reservas, dados_clientes, clientes, tamanho_lote):
+    faltando = [chave for chave in dados_clientes if chave not in clientes]
+    clientes.update(_clientes_existentes(faltando))
+
+    alterados = []
+    novos = []
+    # Só os que ainda não tinham sido resolvidos: a primeira ocorrência vale
+    for chave in faltando:
+        reserva = dados_clientes[chave]
+        area = reserva.get('area') or ''
+        cliente = clientes.get(chave)
+        if cliente is None:
+            cliente = clientes[chave] = Cliente(
+                nome=reserva['nome'],
+                nome_normalizado=normalizar_nome(reserva['nome']),
+                telefone=reserva['telefone'],
+                area=area,
+            )
+            novos.append(cliente)
+        elif (cliente.telefone, cliente.area) != (reserva['telefone'], area):
+            cliente.telefone = reserva['telefone']
+            cliente.area = area
+            alterados.append(cliente)
+
+    Cliente.objects.bulk_create(novos, batch_size=tamanho_lote)
+    Cliente.objects.bulk_update(alterados, ['telefone', 'area'], batch_size=tamanho_lote)
+
+    agendas = [
+        Agenda(
+            cliente=clientes[reserva['nome'].upper()],
+            **{campo: reserva.get(campo) for campo in CAMPOS_AGENDA},
+        )
+        for reserva in reservas
+    ]
+    # bulk_create não dispara o post_save que conta a sessão no pacote
+    pacotes.vincular_lote(agendas)
+    agendas = Agenda.objects.bulk_create(agendas, batch_size=tamanho_lote)
+    Painel.objects.bulk_create(
+        [Painel(agenda=agenda) for agenda in agendas], batch_size=tamanho_lote
+    )
+
+    resumo = {
+        'agendas': len(agendas),
+        'clientes_novos': len(novos),
+        'clientes_atualizados': len(alterados),
+    }
+    return resumo, agendas
@@ -0,0 +1,116 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import autocomplete, eventos, pacotes, resumos, versoes
+from .models import Agenda, Cliente, Pacote, Painel
+
+
+_adiados = ContextVar('dias_adiados', default=None)
+
+
+def _processar(dias):
+    # A versão só muda depois do commit: antes disso, uma requisição
+    # concorrente geraria PDF/ETag com os dados antigos sob a versão nova
+    transaction.on_commit(lambda: versoes.invalidar_dias(*dias))
+    resumos.recalcular_dias(*dias)
+    eventos.publicar(dias)
+
+
+def dias_alterados(*dias):
+    """
+    Avisa que as agendas/presenças destes dias mudaram. Chamado pelos sinais
+    e, explicitamente, depois de operações em lote (bulk_update/bulk_create)
+    que não disparam sinais.
+    """
+    dias = {dia for dia in dias if dia}
+    pendentes = _adiados.get()
+    if pendentes is not None:
+        pendentes.update(dias)
+    elif dias:
+        _processar(dias)
+
+
+@contextmanager
+def dias_adiados():
+    """
+    Junta os dias alterados dentro do bloco e processa cada um uma única vez
+    na saída (depois do commit, se o bloco envolver um transaction.atomic).
+    Se o bloco falhar, nada é processado.
+    """
+    pendentes = set()
+    token = _adiados.set(pendentes)
+    try:
+        yield
+    finally:
+        _adiados.reset(token)
+    if pendentes:
+        _processar(pendentes)
+
+
+@receiver([post_save, post_delete], sender=Cliente)
+@receiver([post_save, post_delete], sender=Pacote)
+def invalidar_autocomplete(sender, **kwargs):
+    autocomplete.invalidar_cache()
+
+
+@receiver([post_save, post_delete], sender=Cliente)
+def invalidar_versao_clientes(sender, created=False, **kwargs):
+    # Um cliente recém-criado ainda não aparece em nenhum relatório
+    if not created:
+        versoes.invalidar_clientes()
+
+
+@receiver([post_save, post_delete], sender=Agenda)
+def agenda_alterada(sender, instance, **kwargs):
+    dias_alterados(instance.data, getattr(instance, '_data_original', None))
+    instance._data_original = instance.data
+
+
+@receiver(post_save, sender=Agenda)
+def agenda_pacote(sender, instance, created, **kwargs):
+    if created:
+        # O painel ainda não existe: a sessão entra como agendada
+        pacotes.mover_agenda(instance.pk, None, instance.pacote_id, presente=False)
+    else:
+        pacotes.mover_agenda(instance.pk, getattr(instance, '_pacote_original', None), instance.pacote_id)
+    instance._pacote_original = instance.pacote_id
+
+
+@receiver(post_delete, sender=Agenda)
+def agenda_removida(sender, instance, **kwargs):
+    # O painel (CASCADE) já foi apagado e devolveu a presença para agendada
+    pacotes.mover_agenda(instance.pk, instance.pacote_id, None, presente=False)
+
+
+@receiver([post_save, post_delete], sender=Painel)
+def painel_alterado(sender, instance, **kwargs):
+    if Painel.agenda.field.is_cached(instance):
+        data = instance.agenda.data
+    else:
+        data = Agenda.objects.filter(pk=instance.agenda_id).values_list('data', flat=True).first()
+    dias_alterados(data)
+
+
+@receiver(post_save, sender=Painel)
+def presenca_pacote(sender, instance, created, **kwargs):
+    anterior = bool(getattr(instance, '_presenca_original', None))
+    if instance.presenca != anterior:
+        pacotes.aplicar_presencas([(_pacote_da_agenda(instance), instance.presenca)])
+    instance._presenca_original = instance.presenca
+
+
+@receiver(post_delete, sender=Painel)
+def presenca_removida(sender, instance, **kwargs):
+    # Presença confirmada que some devolve a sessão ao pacote
+    if instance.presenca:
+        pacotes.aplicar_presencas([(_pacote_da_agenda(instance), False)])
+
+
+def _pacote_da_agenda(painel):
+    if Painel.agenda.field.is_cached(painel):
+        return painel.agenda.pacote_id
+    return Agenda.objects.filter(pk=painel.agenda_id).values_list('pacote_id', flat=True).first()
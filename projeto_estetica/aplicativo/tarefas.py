@@ -0,0 +1,132 @@
+"""
+Fila de exportações de PDF guardada no próprio banco.
+
+A view cria uma TarefaRelatorio pendente e devolve a página de espera; o
+comando `manage.py processar_relatorios` reserva as pendentes e gera os
+PDFs num pool de processos, fora dos workers do gunicorn. Não depende de
+Redis nem de outro broker: a reserva é um UPDATE condicional no status. O
+PDF vai para o default_storage (ver ARQUIVOS_STORAGE), único caminho entre
+o worker e o web, que podem rodar em máquinas diferentes.
+"""
+import logging
+from datetime import timedelta
+from tempfile import TemporaryFile
+
+from django.core.files import File
+from django.utils import timezone
+
+from . import telemetria
+from .models import TarefaRelatorio
+from .relatorios_pdf import gerar_pdf, nome_arquivo
+
+logger = logging.getLogger(__name__)
+
+REAPROVEITAVEIS = (TarefaRelatorio.PENDENTE, TarefaRelatorio.PROCESSANDO, TarefaRelatorio.CONCLUIDA)
+
+
+def enfileirar_pdf(inicio, fim, etag):
+    """Reaproveita a tarefa do mesmo conteúdo (mesmo etag) se ela ainda vale."""
+    tarefa = (
+        TarefaRelatorio.objects
+        .filter(etag=etag, inicio=inicio, fim=fim, status__in=REAPROVEITAVEIS)
+        .order_by('-criado_em')
+        .first()
+    )
+    if tarefa is None:
+        tarefa = TarefaRelatorio.objects.create(inicio=inicio, fim=fim, etag=etag)
+    return tarefa
+
+
+def reservar_pendentes(limite):
+    """Marca até `limite` tarefas pendentes como em processamento e devolve seus ids."""
+    candidatas = list(
+        TarefaRelatorio.objects
+        .filter(status=TarefaRelatorio.PENDENTE)
+        .order_by('criado_em')
+        .values_list('id', flat=True)[:limite]
+    )
+    reservadas = []
+    for pk in candidatas:
+        # Só um worker consegue trocar o status de pendente para processando
+        atualizadas = (
+            TarefaRelatorio.objects
+            .filter(pk=pk, status=TarefaRelatorio.PENDENTE)
+            .update(status=TarefaRelatorio.PROCESSANDO, iniciado_em=timezone.now())
+        )
+        if atualizadas:
+            reservadas.append(pk)
+    return reservadas
+
+
+def executar_tarefa(pk):
+    """Gera o PDF de uma tarefa já reservada. Roda dentro do processo do pool."""
+    tarefa = TarefaRelatorio.objects.get(pk=pk)
+    try:
+        with TemporaryFile() as arquivo:
+            total, cronometro = gerar_pdf(tarefa.inicio, tarefa.fim, arquivo)
+            tamanho = arquivo.tell()
+            arquivo.seek(0)
+            tarefa.arquivo.save(nome_arquivo(tarefa.inicio, tarefa.fim), File(arquivo), save=False)
+    except Exception as e:
+        telemetria.registrar_erro('tarefa', id=pk)
+        marcar_erro(pk, str(e))
+        return TarefaRelatorio.ERRO
+
+    tarefa.status = TarefaRelatorio.CONCLUIDA
+    tarefa.erro = ''
+    tarefa.concluido_em = timezone.now()
+    tarefa.save(update_fields=['arquivo', 'status', 'erro', 'concluido_em'])
+    telemetria.registrar_exportacao(
+        'tarefa', cronometro, total, tamanho, id=pk, inicio=tarefa.inicio, fim=tarefa.fim
+    )
+    return TarefaRelatorio.CONCLUIDA
+
+
+def marcar_erro(pk, mensagem):
+    TarefaRelatorio.objects.filter(pk=pk).update(
+        status=TarefaRelatorio.ERRO, erro=mensagem, concluido_em=timezone.now()
+    )
+
+
+def reenfileirar(pk):
+    """
+    Devolve à fila uma tarefa concluída cujo arquivo sumiu do storage. Só a
+    primeira chamada troca o status; retorna se foi ela.
+    """
+    atualizadas = (
+        TarefaRelatorio.objects
+        .filter(pk=pk, status=TarefaRelatorio.CONCLUIDA)
+        .update(
+            status=TarefaRelatorio.PENDENTE, arquivo='', erro='',
+            iniciado_em=None, concluido_em=None,
+        )
+    )
+    if atualizadas:
+        logger.warning("Arquivo do relatório não encontrado no storage; tarefa reenfileirada id=%s", pk)
+    return bool(atualizadas)
+
+
+def liberar_travadas(minutos):
+    """Devolve à fila tarefas que ficaram em processamento (worker encerrado no meio)."""
+    limite = timezone.now() - timedelta(minutes=minutos)
+    return (
+        TarefaRelatorio.objects
+        .filter(status=TarefaRelatorio.PROCESSANDO, iniciado_em__lt=limite)
+        .update(status=TarefaRelatorio.PENDENTE, iniciado_em=None)
+    )
+
+
+def limpar_antigas(horas):
+    """Apaga tarefas finalizadas há mais de `horas` horas, junto com os arquivos."""
+    limite = timezone.now() - timedelta(hours=horas)
+    antigas = TarefaRelatorio.objects.filter(
+        status__in=(TarefaRelatorio.CONCLUIDA, TarefaRelatorio.ERRO),
+        concluido_em__lt=limite,
+    )
+    total = 0
+    for tarefa in antigas.iterator():
+        if tarefa.arquivo:
+            tarefa.arquivo.delete(save=False)
+        tarefa.delete()
+        total += 1
+    return total
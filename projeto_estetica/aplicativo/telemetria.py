@@ -0,0 +1,126 @@
+"""
+Telemetria da exportação de PDF.
+
+As etapas (consulta ao banco, render do PDF e total) são medidas com
+perf_counter pelo Cronometro de relatorios_pdf. Uma fração das exportações
+(TELEMETRIA_AMOSTRAGEM) gera uma linha de log chave=valor e entra nos
+histogramas, guardados no cache para somar os workers do gunicorn e
+exportados no formato texto do Prometheus pela view metricas_prometheus.
+Falhas são sempre registradas, com ou sem amostragem.
+"""
+import logging
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+ORIGENS = ('request', 'tarefa')
+ETAPAS = ('consulta', 'render', 'total')
+# Limites dos buckets em segundos (o +Inf é implícito)
+BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+METRICA = 'clinica_exportar_pdf'
+
+
+def _chave(origem, etapa):
+    return f'telemetria:pdf:{origem}:{etapa}'
+
+
+def _chave_totais(origem):
+    return f'telemetria:pdf:{origem}:totais'
+
+
+def amostrar():
+    """Decide se esta exportação entra no log e nas métricas."""
+    taxa = settings.TELEMETRIA_AMOSTRAGEM
+    return taxa >= 1 or random.random() < taxa
+
+
+def _observar(histograma, segundos):
+    if histograma is None:
+        histograma = {'buckets': [0] * (len(BUCKETS) + 1), 'soma': 0.0, 'contagem': 0}
+    indice = next((i for i, limite in enumerate(BUCKETS) if segundos <= limite), len(BUCKETS))
+    histograma['buckets'][indice] += 1
+    histograma['soma'] += segundos
+    histograma['contagem'] += 1
+    return histograma
+
+
+def registrar_exportacao(origem, cronometro, linhas, tamanho, **contexto):
+    """Log e métricas de uma exportação concluída (se sorteada na amostragem)."""
+    if not amostrar():
+        return
+    tempos = cronometro.tempos
+    logger.info(
+        "exportar_pdf origem=%s %s linhas=%d consulta_ms=%.1f render_ms=%.1f total_ms=%.1f bytes=%d",
+        origem, ' '.join(f'{chave}={valor}' for chave, valor in contexto.items()), linhas,
+        tempos.get('consulta', 0.0), tempos.get('render', 0.0), tempos.get('total', 0.0), tamanho,
+    )
+
+    # get/set sem trava: exportações simultâneas podem perder uma observação,
+    # o que não muda os percentis de forma perceptível
+    chaves = [_chave(origem, etapa) for etapa in ETAPAS] + [_chave_totais(origem)]
+    atuais = cache.get_many(chaves)
+    novos = {
+        _chave(origem, etapa): _observar(atuais.get(_chave(origem, etapa)), tempos.get(etapa, 0.0) / 1000)
+        for etapa in ETAPAS
+    }
+    totais = atuais.get(_chave_totais(origem)) or {'linhas': 0, 'bytes': 0, 'erros': 0}
+    totais['linhas'] += linhas
+    totais['bytes'] += tamanho
+    novos[_chave_totais(origem)] = totais
+    cache.set_many(novos, None)
+
+
+def registrar_erro(origem, **contexto):
+    logger.exception(
+        "exportar_pdf falhou origem=%s %s",
+        origem, ' '.join(f'{chave}={valor}' for chave, valor in contexto.items()),
+    )
+    totais = cache.get(_chave_totais(origem)) or {'linhas': 0, 'bytes': 0, 'erros': 0}
+    totais['erros'] += 1
+    cache.set(_chave_totais(origem), totais, None)
+
+
+def _rotulos(**rotulos):
+    return '{' + ','.join(f'{chave}="{valor}"' for chave, valor in rotulos.items()) + '}'
+
+
+def texto_prometheus():
+    """Métricas acumuladas no formato de exposição texto do Prometheus (0.0.4)."""
+    chaves = [_chave(origem, etapa) for origem in ORIGENS for etapa in ETAPAS]
+    chaves += [_chave_totais(origem) for origem in ORIGENS]
+    valores = cache.get_many(chaves)
+
+    linhas = [
+        f'# HELP {METRICA}_segundos Duração das etapas da exportação de PDF (amostrada).',
+        f'# TYPE {METRICA}_segundos histogram',
+    ]
+    for origem in ORIGENS:
+        for etapa in ETAPAS:
+            histograma = valores.get(_chave(origem, etapa))
+            if histograma is None:
+                continue
+            acumulado = 0
+            for limite, quantidade in zip(BUCKETS + ('+Inf',), histograma['buckets']):
+                acumulado += quantidade
+                rotulos = _rotulos(origem=origem, etapa=etapa, le=limite)
+                linhas.append(f'{METRICA}_segundos_bucket{rotulos} {acumulado}')
+            rotulos = _rotulos(origem=origem, etapa=etapa)
+            linhas.append(f'{METRICA}_segundos_sum{rotulos} {histograma["soma"]:.6f}')
+            linhas.append(f'{METRICA}_segundos_count{rotulos} {histograma["contagem"]}')
+
+    for nome, descricao in (
+        ('linhas', 'Linhas de agenda exportadas (amostrado).'),
+        ('bytes', 'Bytes de PDF gerados (amostrado).'),
+        ('erros', 'Exportações que falharam.'),
+    ):
+        linhas.append(f'# HELP {METRICA}_{nome}_total {descricao}')
+        linhas.append(f'# TYPE {METRICA}_{nome}_total counter')
+        for origem in ORIGENS:
+            totais = valores.get(_chave_totais(origem))
+            if totais is not None:
+                linhas.append(f'{METRICA}_{nome}_total{_rotulos(origem=origem)} {totais[nome]}')
+    return '\n'.join(linhas) + '\n'
@@ -1,3 +1,108 @@
-from django.test import TestCase
+import json
+from datetime import date, time
 
-# Create your tests here.
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from . import links
+from .models import Agenda, Cliente, ClienteLink, Pacote, Painel
+from .orcamento import OrcamentoMixin
+
+DIA = date(2030, 3, 4)
+CACHE_LOCAL = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=CACHE_LOCAL, METRICAS_ATIVAS=False)
+class OrcamentoConsultasTests(OrcamentoMixin, TestCase):
+    """
+    Cada view com @orcamento_consultas é chamada com o cache vazio (o pior
+    caso) e falha se passar do orçamento declarado.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.cliente = Cliente.objects.create(nome='Maria Souza', telefone='11999990000', area='Rosto')
+        pacote = Pacote.objects.create(cliente=cls.cliente, total_sessoes=10)
+        cls.agendas = []
+        for hora in (9, 10, 11):
+            agenda = Agenda.objects.create(
+                cliente=cls.cliente, pacote=pacote, data=DIA, horario=time(hora),
+                tipo_pacote='pacote', forma_pagamento='pix', valor=100,
+                profissional='Ana', sala='1',
+            )
+            Painel.objects.create(agenda=agenda)
+            cls.agendas.append(agenda)
+        cls.link = ClienteLink.objects.create(
+            cliente=cls.cliente, codigo='codigo-teste',
+            link_completo='http://testserver/cliente/maria-souza/codigo-teste/',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cadastro_agenda(self):
+        self.assertDentroDoOrcamento(reverse('cadastro_agenda'))
+        resposta = self.assertDentroDoOrcamento(reverse('cadastro_agenda'), 'post', {
+            'nome': 'Cliente Nova', 'telefone': '11988887777', 'area': 'Pernas',
+            'data': DIA.isoformat(), 'horario': '15:00', 'duracao': 60,
+            'tipo_pacote': 'pacote', 'quantidade_pacote': '5', 'forma_pagamento': 'pix', 'valor': '80',
+        })
+        self.assertEqual(resposta.status_code, 302)
+
+    def test_horarios_livres(self):
+        self.assertDentroDoOrcamento(f"{reverse('horarios_livres')}?data={DIA}&profissional=Ana")
+
+    def test_autocomplete_cliente(self):
+        self.assertDentroDoOrcamento(f"{reverse('autocomplete_cliente')}?term=mar")
+
+    def test_opcoes_cliente(self):
+        self.assertDentroDoOrcamento(f"{reverse('opcoes_cliente')}?q=mar")
+
+    def test_painel_presenca(self):
+        self.assertDentroDoOrcamento(f"{reverse('painel_presenca')}?data={DIA}")
+        self.assertDentroDoOrcamento(reverse('painel_presenca'), 'post', {
+            'data': DIA.isoformat(),
+            **{f'presenca_{agenda.pk}': 'on' for agenda in self.agendas[:2]},
+        })
+
+    def test_presenca_agenda(self):
+        resposta = self.assertDentroDoOrcamento(
+            reverse('presenca_agenda', args=[self.agendas[0].pk]), 'patch', json.dumps({'presenca': True}),
+        )
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_calendario_agenda(self):
+        self.assertDentroDoOrcamento(f"{reverse('calendario_agenda')}?data={DIA}")
+
+    def test_editar_agenda(self):
+        url = reverse('editar_agenda', args=[self.agendas[0].pk])
+        self.assertDentroDoOrcamento(url)
+        self.assertDentroDoOrcamento(url, 'post', {
+            'nome': self.cliente.nome, 'telefone': self.cliente.telefone, 'area': 'Pescoço',
+            'data': DIA.isoformat(), 'horario': '09:00', 'duracao': 60,
+            'tipo_pacote': 'pacote', 'forma_pagamento': 'pix', 'valor': '120',
+            'profissional': 'Ana', 'sala': '1',
+        })
+
+    def test_relatorio_presenca(self):
+        self.assertDentroDoOrcamento(f"{reverse('relatorio_presenca')}?data={DIA}")
+
+    def test_perfil_cliente(self):
+        self.assertDentroDoOrcamento(reverse('perfil_cliente', args=[self.cliente.pk]))
+        self.assertDentroDoOrcamento(reverse('perfil_cliente_api', args=[self.cliente.pk]))
+
+    def test_asscontrato(self):
+        self.assertDentroDoOrcamento(reverse('asscontrato'))
+        self.assertDentroDoOrcamento(f"{reverse('asscontrato')}?nome={self.cliente.pk}")
+
+    def test_link_assinado(self):
+        token = links.gerar_token(self.cliente)
+        resposta = self.assertDentroDoOrcamento(reverse('link_assinado', args=['maria-souza', token]))
+        self.assertEqual(resposta.status_code, 200)
+
+    def test_mensagem_view(self):
+        resposta = self.assertDentroDoOrcamento(
+            reverse('mensagem_cliente', args=['maria-souza', self.link.codigo])
+        )
+        self.assertEqual(resposta.status_code, 200)
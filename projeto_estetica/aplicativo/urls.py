@@ -3,11 +3,22 @@ from . import views
 
 urlpatterns = [
     path('painel-presenca/', views.painel_presenca, name='painel_presenca'),
+    path('painel-presenca/<int:agenda_id>/', views.presenca_agenda, name='presenca_agenda'),
+    path('painel-presenca/eventos/', views.eventos_painel, name='eventos_painel'),
     path('agenda/editar/<int:pk>/', views.editar_agenda, name='editar_agenda'),
+    path('agenda/calendario/', views.calendario_agenda, name='calendario_agenda'),
+    path('agenda/horarios-livres/', views.horarios_livres, name='horarios_livres'),
     path('autocomplete-cliente/', views.autocomplete_cliente, name='autocomplete_cliente'),
+    path('clientes/opcoes/', views.opcoes_cliente, name='opcoes_cliente'),
+    path('clientes/<int:pk>/', views.perfil_cliente, name='perfil_cliente'),
+    path('clientes/<int:pk>/api/', views.perfil_cliente_api, name='perfil_cliente_api'),
     path('cadastro-agenda/', views.cadastro_agenda, name='cadastro_agenda'),
     path('relatorio-presenca/', views.relatorio_presenca, name='relatorio_presenca'),
     path('painel/exportar-pdf/', views.exportar_pdf, name='exportar_pdf'),
+    path('painel/relatorios/<int:pk>/', views.tarefa_relatorio, name='tarefa_relatorio'),
+    path('painel/relatorios/<int:pk>/status/', views.tarefa_relatorio_status, name='tarefa_relatorio_status'),
+    path('painel/relatorios/<int:pk>/download/', views.tarefa_relatorio_download, name='tarefa_relatorio_download'),
+    path('metricas/', views.metricas_prometheus, name='metricas_prometheus'),
 
     path('asscontrato/', views.asscontrato, name='asscontrato'),
 
@@ -15,5 +26,10 @@ urlpatterns = [
     path("cliente/<str:nome>/<str:codigo>/", views.mensagem_view, name="mensagem_cliente"),
 
     path("cliente/link/excluir/<int:pk>/", views.excluir_link, name="excluir_link"),
+    path("cliente/link/arquivar/<int:pk>/", views.arquivar_link, name="arquivar_link"),
+    path("contrato/revogar/", views.revogar_link, name="revogar_link"),
+    path("contrato/assinado/<str:token>/", views.contrato_assinado, name="contrato_assinado"),
+    path("contrato/<str:nome>/<str:token>/", views.link_assinado, name="link_assinado"),
+    path("contrato/assinado/<str:token>/pdf/", views.contrato_assinado_pdf, name="contrato_assinado_pdf"),
 
 ]
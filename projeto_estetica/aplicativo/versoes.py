@@ -0,0 +1,64 @@
+"""
+Versões de conteúdo por dia, guardadas no cache.
+
+Cada dia tem um token aleatório que muda sempre que uma agenda (ou o painel
+dela) daquele dia é gravada ou apagada. Quem guarda algo derivado de um dia
+(PDF, resposta pronta) usa o token na chave: ao mudar o dia, a chave antiga
+simplesmente deixa de ser consultada. Se o token sumir do cache, um novo é
+criado, o que também invalida tudo o que foi gerado com o antigo.
+"""
+import hashlib
+import uuid
+from datetime import timedelta
+
+from django.core.cache import cache
+
+CHAVE_CLIENTES = 'versao:clientes'
+
+
+def _chave_dia(dia):
+    return f'versao:dia:{dia}'
+
+
+def _novo_token():
+    return uuid.uuid4().hex[:12]
+
+
+def _obter(chaves):
+    """Lê os tokens das chaves numa única ida ao cache, criando os ausentes."""
+    encontrados = cache.get_many(chaves)
+    faltando = {chave: _novo_token() for chave in chaves if chave not in encontrados}
+    for chave, token in faltando.items():
+        # add() não sobrescreve um token criado por outro processo nesse meio tempo
+        if not cache.add(chave, token, None):
+            token = cache.get(chave) or token
+        encontrados[chave] = token
+    return [encontrados[chave] for chave in chaves]
+
+
+def dias_do_periodo(inicio, fim):
+    return [inicio + timedelta(days=i) for i in range((fim - inicio).days + 1)]
+
+
+def versoes_periodo(inicio, fim):
+    """Tokens de cada dia do período seguidos do token dos clientes."""
+    chaves = [_chave_dia(dia) for dia in dias_do_periodo(inicio, fim)]
+    return _obter(chaves + [CHAVE_CLIENTES])
+
+
+def etag_periodo(prefixo, inicio, fim):
+    versoes = versoes_periodo(inicio, fim)
+    base = f'{prefixo}:{inicio}:{fim}:' + ':'.join(versoes)
+    return hashlib.md5(base.encode('utf-8')).hexdigest()
+
+
+def invalidar_dias(*dias):
+    cache.set_many({_chave_dia(dia): _novo_token() for dia in set(dias) if dia}, None)
+
+
+def versao_clientes():
+    return _obter([CHAVE_CLIENTES])[0]
+
+
+def invalidar_clientes():
+    cache.set(CHAVE_CLIENTES, _novo_token(), None)
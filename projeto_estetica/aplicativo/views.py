@@ -1,24 +1,52 @@
-from django.shortcuts import render, redirect, get_object_or_404
+from django.conf import settings
+from django.contrib import messages
+from asgiref.sync import sync_to_async
+from django.shortcuts import aget_object_or_404, render, redirect, get_object_or_404
+from django.urls import reverse
 from django.http import JsonResponse
-from .models import Agenda, Cliente, Painel,ClienteLink
+from .models import Agenda, Cliente, Painel,ClienteLink, TarefaRelatorio
 from .forms import AgendaForm, PainelFiltroForm, ClienteForm
-
-import time
+from . import assinaturas, eventos, historico, horarios, links, pacotes, relatorios, servicos, telemetria, versoes
+from .signals import dias_alterados
+from .autocomplete import abuscar_clientes, aopcoes_clientes, normalizar_nome
+from .calendario import calendario_json, etag_calendario
+from .orcamento import orcamento_consultas
+from .tarefas import enfileirar_pdf, reenfileirar
+from .relatorios_pdf import (
+    cabe_no_cache, etag_pdf, gerar_pdf_temporario, guardar_pdf, nome_arquivo,
+    pdf_em_cache,
+)
+
+from django.db import transaction
 from django.views.decorators.http import require_http_methods
-from django.http import HttpResponse
-from datetime import date
-from io import BytesIO
-from reportlab.lib.pagesizes import A4, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib import colors
-from reportlab.lib.styles import ParagraphStyle
-from reportlab.lib.units import cm
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import quote_etag
+from datetime import date, timedelta
 
 
+import asyncio
+import hashlib
+import json
+import os
 import uuid
+from django.utils import timezone
 from django.utils.text import slugify
 
+MAX_DIAS_EXPORTACAO = 366
+LINKS_POR_PAGINA = 50
+MAX_DIAS_CALENDARIO = 62
+
+AGRUPAMENTOS_RELATORIO = [
+    ('dia', 'Por dia'),
+    ('mes', 'Por mês'),
+    ('forma_pagamento', 'Por forma de pagamento'),
+    ('tipo_pacote', 'Por tipo de pacote'),
+]
+
 
+@orcamento_consultas(17)
 def cadastro_agenda(request):
     copiado = request.session.pop('agenda_copiada', None)
     if copiado:
@@ -30,46 +58,68 @@ def cadastro_agenda(request):
 
         form = AgendaForm(request.POST)
         if form.is_valid():
-            nome = form.cleaned_data['nome']
-            telefone = form.cleaned_data['telefone']
-            area = form.cleaned_data['area']
-
-            # Buscar cliente por nome (case-insensitive)
-            cliente = Cliente.objects.filter(nome__iexact=nome).first()
-            if cliente:
-                cliente.telefone = telefone
-                cliente.area = area
-                cliente.save()
+            # Cliente (buscado pelo nome, sem diferenciar maiúsculas), agenda
+            # e painel são gravados numa única transação
+            try:
+                servicos.agendar(
+                    form.cleaned_data['nome'],
+                    form.cleaned_data['telefone'],
+                    form.cleaned_data['area'],
+                    form.save(commit=False),
+                )
+            except servicos.ConflitoHorario as e:
+                form.add_error(None, str(e))
             else:
-                cliente = Cliente.objects.create(nome=nome, telefone=telefone,area=area)
-
-            agenda = form.save(commit=False)
-            agenda.cliente = cliente
-            agenda.save()
+                return redirect('cadastro_agenda')
+    return render(request, 'agenda.html', {'form': form})
 
-            Painel.objects.get_or_create(agenda=agenda)
 
-            return redirect('cadastro_agenda')
-    return render(request, 'agenda.html', {'form': form})
+@orcamento_consultas(2)
+@require_http_methods(["GET"])
+def horarios_livres(request):
+    """Horários livres do dia para um profissional e/ou sala (JSON)."""
+    profissional = request.GET.get('profissional', '').strip()
+    sala = request.GET.get('sala', '').strip()
+    try:
+        dia = date.fromisoformat(request.GET.get('data', ''))
+        duracao = int(request.GET.get('duracao') or 60)
+    except ValueError:
+        return HttpResponseBadRequest("Informe data (AAAA-MM-DD) e duração válidas.")
+    if not (profissional or sala) or not 5 <= duracao <= 12 * 60:
+        return HttpResponseBadRequest("Informe o profissional ou a sala e uma duração entre 5 e 720 minutos.")
+
+    livres = horarios.horarios_livres(dia, duracao, profissional, sala)
+    return JsonResponse({
+        'data': dia,
+        'duracao': duracao,
+        'horarios': [horario.strftime('%H:%M') for horario in livres],
+    })
 
 
-def autocomplete_cliente(request):
+@orcamento_consultas(2)
+async def autocomplete_cliente(request):
     term = request.GET.get('term', '')
-    clientes = Cliente.objects.filter(nome__istartswith=term)[:10]
-    results = [{'label': c.nome, 'value': c.nome, 'telefone': c.telefone, 'area':c.area} for c in clientes]
-    return JsonResponse(results, safe=False)
+    results = await abuscar_clientes(term)
+    response = JsonResponse(results, safe=False)
+    # Permite que o navegador reaproveite a resposta ao apagar/redigitar letras
+    patch_cache_control(response, private=True, max_age=30)
+    return response
 
 
-@require_http_methods(["GET", "POST"])
-def painel_presenca(request):
-    filtro_form = PainelFiltroForm(request.GET if request.method == "GET" else request.POST)
+@orcamento_consultas(2)
+async def opcoes_cliente(request):
+    """Busca paginada de clientes (id e nome) para o campo de escolha de cliente."""
+    try:
+        pagina = max(int(request.GET.get('pagina', 1)), 1)
+    except ValueError:
+        return HttpResponseBadRequest("Página inválida.")
+    response = JsonResponse(await aopcoes_clientes(request.GET.get('q', ''), pagina))
+    patch_cache_control(response, private=True, max_age=30)
+    return response
 
-    data_selecionada = (
-        filtro_form.cleaned_data['data']
-        if filtro_form.is_valid() and filtro_form.cleaned_data.get('data')
-        else date.today()
-    )
 
+def _agendas_do_dia(data_selecionada):
+    """Linhas do painel (dicts prontos para o template)."""
     # Pré-carrega cliente e painel para evitar N+1 queries
     agendas = (
         Agenda.objects
@@ -85,6 +135,7 @@ def painel_presenca(request):
         cliente = agenda.cliente
         agendas_info.append({
             'id': agenda.id,
+            'cliente_id': cliente.id,
             'nome': cliente.nome,
             'telefone': cliente.telefone,
             'area': cliente.area,
@@ -96,6 +147,25 @@ def painel_presenca(request):
             'valor': agenda.valor,
             'presenca': painel.presenca if painel else False,
         })
+    return agendas_info
+
+
+def _etag_painel(request, versao):
+    # O token CSRF vai na página: se o segredo do cookie mudar, o ETag muda junto
+    base = f"{versao}:{request.META.get('CSRF_COOKIE', '')}"
+    return quote_etag(hashlib.md5(base.encode('utf-8')).hexdigest())
+
+
+@orcamento_consultas(15)
+@require_http_methods(["GET", "POST"])
+def painel_presenca(request):
+    filtro_form = PainelFiltroForm(request.GET if request.method == "GET" else request.POST)
+
+    data_selecionada = (
+        filtro_form.cleaned_data['data']
+        if filtro_form.is_valid() and filtro_form.cleaned_data.get('data')
+        else date.today()
+    )
 
     if request.method == "POST":
         data_str = request.POST.get('data')
@@ -104,124 +174,291 @@ def painel_presenca(request):
         except (ValueError, TypeError):
             data_painel = date.today()
 
-        # Atualiza todos os painéis em lote
-        painel_updates = []
-        for agenda_info in agendas_info:
-            presenca_field = f"presenca_{agenda_info['id']}"
-            presenca_valor = presenca_field in request.POST
-
-            painel = paineis.get(agenda_info['id'])
-            if painel and painel.presenca != presenca_valor:
-                painel.presenca = presenca_valor
-                painel_updates.append(painel)
-
-        if painel_updates:
-            Painel.objects.bulk_update(painel_updates, ['presenca'])
+        # Agendas do dia separadas pela presença enviada no formulário
+        desejadas = {True: [], False: []}
+        for agenda_id in Agenda.objects.filter(data=data_selecionada).values_list('id', flat=True):
+            desejadas[f"presenca_{agenda_id}" in request.POST].append(agenda_id)
+
+        alterou = False
+        with transaction.atomic():
+            for presenca, ids in desejadas.items():
+                # Como no PATCH (presenca_agenda): só as linhas que ainda não
+                # têm o valor, travadas. Duas telas salvando a mesma presença
+                # não contam a sessão do pacote duas vezes.
+                alterados = list(
+                    Painel.objects.select_for_update(of=('self',))
+                    .filter(agenda_id__in=ids)
+                    .exclude(presenca=presenca)
+                    .values_list('id', 'agenda__pacote_id')
+                )
+                if alterados:
+                    Painel.objects.filter(id__in=[painel_id for painel_id, _ in alterados]).update(presenca=presenca)
+                    pacotes.aplicar_presencas([(pacote_id, presenca) for _, pacote_id in alterados])
+                    alterou = True
+        if alterou:
+            # update() não dispara sinais
+            dias_alterados(data_selecionada)
 
         return redirect(f"{request.path}?data={data_painel.strftime('%Y-%m-%d')}")
 
-    return render(request, 'painel.html', {
+    # A versão do dia (e dos clientes) muda a cada gravação de Agenda/Painel
+    # daquele dia: página já vista e sem mudanças responde 304 sem consultas
+    # nem render. Com mensagens pendentes a página precisa ser renderizada.
+    versao = versoes.etag_periodo('painel', data_selecionada, data_selecionada)
+    if not len(messages.get_messages(request)):
+        response = get_conditional_response(request, etag=_etag_painel(request, versao))
+        if response is not None:
+            return response
+
+    # Períodos para exportação semanal/mensal a partir do dia exibido
+    semana_inicio = data_selecionada - timedelta(days=data_selecionada.weekday())
+    mes_inicio = data_selecionada.replace(day=1)
+    mes_fim = (mes_inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+
+    response = render(request, 'painel.html', {
         'form': filtro_form,
-        'agendas_info': agendas_info,
+        # Chamado pelo template só se as linhas não estiverem no cache de fragmento
+        'agendas_info': lambda: _agendas_do_dia(data_selecionada),
+        'versao_painel': versao,
+        'painel_cache_timeout': settings.PAINEL_CACHE_TIMEOUT,
         'data_selecionada': data_selecionada,
+        'semana_inicio': semana_inicio,
+        'semana_fim': semana_inicio + timedelta(days=6),
+        'mes_inicio': mes_inicio,
+        'mes_fim': mes_fim,
+    })
+    response['ETag'] = _etag_painel(request, versao)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+@orcamento_consultas(14)
+@require_http_methods(["PATCH"])
+def presenca_agenda(request, agenda_id):
+    """
+    Marca ou desmarca a presença de uma agenda ({"presenca": true/false}) e
+    devolve os totais do dia. Usado pelo painel a cada clique, sem reenviar
+    o formulário inteiro.
+    """
+    try:
+        presenca = json.loads(request.body)['presenca']
+    except (ValueError, KeyError, TypeError):
+        presenca = None
+    if not isinstance(presenca, bool):
+        return HttpResponseBadRequest('Envie {"presenca": true} ou {"presenca": false}.')
+
+    agenda = (
+        Painel.objects.filter(agenda_id=agenda_id)
+        .values('agenda__data', 'agenda__pacote_id').first()
+    )
+    if agenda is None:
+        raise Http404("Agenda sem painel.")
+
+    with transaction.atomic():
+        # UPDATE ... WHERE presenca <> x: cliques repetidos não mexem no pacote
+        alterado = (
+            Painel.objects.filter(agenda_id=agenda_id)
+            .exclude(presenca=presenca)
+            .update(presenca=presenca)
+        )
+        if alterado:
+            pacotes.aplicar_presencas([(agenda['agenda__pacote_id'], presenca)])
+    if alterado:
+        # update() não dispara sinais
+        dias_alterados(agenda['agenda__data'])
+
+    return JsonResponse({
+        'presenca': presenca,
+        'alterado': bool(alterado),
+        **relatorios.totais_dia(agenda['agenda__data']),
     })
 
 
 @require_http_methods(["GET"])
-def exportar_pdf(request):
-    print("Iniciando exportar_pdf")
+async def eventos_painel(request):
+    """
+    Server-Sent Events com os avisos de mudança do dia (?data=AAAA-MM-DD)
+    para as telas do painel. Só no ASGI: no WSGI cada tela prenderia um
+    worker, então a resposta é 204 e o EventSource do navegador desiste.
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    try:
+        dia = date.fromisoformat(request.GET.get('data', ''))
+    except ValueError:
+        return HttpResponseBadRequest("Informe a data (AAAA-MM-DD).")
+
+    async def fluxo():
+        async with eventos.assinar(dia) as fila:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    evento = await asyncio.wait_for(fila.get(), settings.EVENTOS_PING)
+                except asyncio.TimeoutError:
+                    # Comentário SSE: mantém a conexão viva em proxies
+                    yield ': ping\n\n'
+                    continue
+                yield f'event: painel\ndata: {json.dumps({"data": str(dia), **evento})}\n\n'
+
+    response = StreamingHttpResponse(fluxo(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
 
-    data_str = request.GET.get('data')
-    print(f"Parâmetro data recebido: {data_str}")
 
+def _periodo_exportacao(request):
+    """
+    Lê o período pedido: ?inicio=&fim= (semana/mês para a contabilidade) ou,
+    como antes, ?data= para um único dia. Retorna None se o período for inválido.
+    """
+    inicio_str = request.GET.get('inicio')
+    fim_str = request.GET.get('fim')
+
+    if inicio_str or fim_str:
+        try:
+            inicio = date.fromisoformat(inicio_str or fim_str)
+            fim = date.fromisoformat(fim_str or inicio_str)
+        except ValueError:
+            return None
+        if fim < inicio or (fim - inicio).days > MAX_DIAS_EXPORTACAO:
+            return None
+        return inicio, fim
+
+    data_str = request.GET.get('data')
     try:
         data_selecionada = date.fromisoformat(data_str) if data_str else date.today()
-        print(f"Data convertida: {data_selecionada}")
     except ValueError:
-        print("Erro ao converter data, usando data atual")
         data_selecionada = date.today()
+    return data_selecionada, data_selecionada
 
-    print("Iniciando consulta no banco de dados...")
-    start_time = time.time()  # tempo início
 
-    try:
-        agendas = list(Agenda.objects.filter(data=data_selecionada).select_related('cliente').order_by('horario'))
-    except Exception as e:
-        print(f"Erro ao consultar banco: {e}")
-        raise
-
-    elapsed_time = time.time() - start_time  # tempo fim - início
-    print(f"Consulta finalizada. Tempo gasto: {elapsed_time:.4f} segundos")
-    print(f"Foram encontrados {len(agendas)} agendas para a data {data_selecionada}")
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4))
-
-    titulo_style = ParagraphStyle(
-        name="Titulo",
-        fontSize=16,
-        leading=20,
-        alignment=1,  # centro
-        spaceAfter=1 * cm
-    )
+@require_http_methods(["GET"])
+def exportar_pdf(request):
+    periodo = _periodo_exportacao(request)
+    if periodo is None:
+        return HttpResponseBadRequest("Período inválido.")
+    inicio, fim = periodo
+
+    # O ETag muda sempre que alguma agenda/painel/cliente do período muda
+    etag = quote_etag(etag_pdf(inicio, fim))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        conteudo = pdf_em_cache(etag)
+        if conteudo is not None:
+            response = HttpResponse(conteudo, content_type='application/pdf')
+        elif inicio != fim and settings.RELATORIOS_EM_SEGUNDO_PLANO:
+            # Períodos longos são gerados pelo worker (manage.py processar_relatorios)
+            tarefa = enfileirar_pdf(inicio, fim, etag)
+            return redirect('tarefa_relatorio', pk=tarefa.pk)
+        else:
+            arquivo = gerar_pdf_temporario(inicio, fim)
+            tamanho = arquivo.seek(0, os.SEEK_END)
+            arquivo.seek(0)
+            if cabe_no_cache(tamanho):
+                conteudo = arquivo.read()
+                arquivo.close()
+                guardar_pdf(etag, conteudo)
+                response = HttpResponse(conteudo, content_type='application/pdf')
+            else:
+                # FileResponse envia o arquivo em blocos, sem carregá-lo inteiro na resposta
+                response = FileResponse(arquivo, content_type='application/pdf')
+        response['Content-Disposition'] = f'attachment; filename="{nome_arquivo(inicio, fim)}"'
 
-    data = [[
-        "Nome", "Telefone", "Data", "Horário", "Tipo", "Qtde", "Área", "Forma Pagamento", "Valor"
-    ]]
+    response['ETag'] = etag
+    # O navegador sempre revalida com If-None-Match; sem mudanças recebe 304
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
 
-    for agenda in agendas:
-        try:
-            linha = [
-                agenda.cliente.nome if agenda.cliente else "",
-                agenda.cliente.telefone if agenda.cliente else "",
-                agenda.data.strftime('%d/%m/%Y'),
-                agenda.horario.strftime('%H:%M') if agenda.horario else "",
-                agenda.tipo_pacote or "",
-                agenda.quantidade_pacote or "",
-                agenda.cliente.area if agenda.cliente else "",
-                agenda.forma_pagamento or "",
-                f"R$ {agenda.valor:.2f}" if agenda.valor is not None else ""
-            ]
-            #print(f"Adicionando linha: {linha}")
-            data.append(linha)
-        except Exception as e:
-            print(f"Erro nos dados da agenda id={agenda.id}: {e}")
-
-    tabela = Table(data, repeatRows=1)
-    tabela.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0d6efd')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor("#f2f2f2")])
-    ]))
-
-    elementos = []
-    elementos.append(Paragraph(f"Clientes do dia - {data_selecionada.strftime('%d/%m/%Y')}", titulo_style))
-    elementos.append(Spacer(1, 12))
-    elementos.append(tabela)
+
+def _periodo_calendario(request):
+    """
+    ?inicio=&fim= explícitos ou a semana (padrão) / mês (?visao=mes) que
+    contém ?data= (hoje se ausente). Retorna None se o período for inválido.
+    """
+    if request.GET.get('inicio') or request.GET.get('fim'):
+        periodo = _periodo_exportacao(request)
+        if periodo is None or (periodo[1] - periodo[0]).days > MAX_DIAS_CALENDARIO:
+            return None
+        return periodo
 
     try:
-        print("Gerando PDF...")
-        doc.build(elementos)
-        print("PDF gerado com sucesso!")
-    except Exception as e:
-        print("Erro ao gerar PDF:")
-        import traceback
-        traceback.print_exc()
-        raise
-
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="clientes_{data_selecionada}.pdf"'
+        dia = date.fromisoformat(request.GET['data']) if request.GET.get('data') else date.today()
+    except ValueError:
+        return None
+    if request.GET.get('visao') == 'mes':
+        inicio = dia.replace(day=1)
+        fim = (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    else:
+        inicio = dia - timedelta(days=dia.weekday())
+        fim = inicio + timedelta(days=6)
+    return inicio, fim
+
+
+@orcamento_consultas(2)
+@require_http_methods(["GET"])
+def calendario_agenda(request):
+    periodo = _periodo_calendario(request)
+    if periodo is None:
+        return HttpResponseBadRequest("Período inválido.")
+    inicio, fim = periodo
+
+    etag = quote_etag(etag_calendario(inicio, fim))
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(calendario_json(inicio, fim, etag), content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
     return response
 
 
+@require_http_methods(["GET"])
+def metricas_prometheus(request):
+    """Métricas da exportação de PDF para o Prometheus (só para METRICAS_IPS)."""
+    if request.META.get('REMOTE_ADDR') not in settings.METRICAS_IPS:
+        raise Http404
+    return HttpResponse(telemetria.texto_prometheus(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def tarefa_relatorio(request, pk):
+    tarefa = get_object_or_404(TarefaRelatorio, pk=pk)
+    return render(request, 'tarefa_relatorio.html', {'tarefa': tarefa})
 
+
+async def tarefa_relatorio_status(request, pk):
+    # Consultada pela página de espera a cada poucos segundos
+    tarefa = await aget_object_or_404(
+        TarefaRelatorio.objects.only('status', 'erro'), pk=pk
+    )
+    return JsonResponse({
+        'status': tarefa.status,
+        'erro': tarefa.erro,
+        'download': (
+            reverse('tarefa_relatorio_download', args=[pk])
+            if tarefa.status == TarefaRelatorio.CONCLUIDA else None
+        ),
+    })
+
+
+def tarefa_relatorio_download(request, pk):
+    tarefa = get_object_or_404(TarefaRelatorio, pk=pk, status=TarefaRelatorio.CONCLUIDA)
+    try:
+        arquivo = tarefa.arquivo.open('rb')
+    except (OSError, ValueError):
+        # Arquivo apagado ou gravado num disco que este processo não enxerga
+        reenfileirar(pk)
+        messages.warning(request, "O arquivo do relatório não estava mais disponível e será gerado novamente.")
+        return redirect('tarefa_relatorio', pk=pk)
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=nome_arquivo(tarefa.inicio, tarefa.fim),
+        content_type='application/pdf',
+    )
+
+
+@orcamento_consultas(15)
 def editar_agenda(request, pk):
-    agenda = get_object_or_404(Agenda, pk=pk)
+    agenda = get_object_or_404(Agenda.objects.select_related('cliente'), pk=pk)
 
     if request.method == 'POST':
 
@@ -235,6 +472,9 @@ def editar_agenda(request, pk):
                 'quantidade_pacote': agenda.quantidade_pacote,
                 'forma_pagamento': agenda.forma_pagamento,
                 'valor': str(agenda.valor),
+                'duracao': agenda.duracao,
+                'profissional': agenda.profissional,
+                'sala': agenda.sala,
                 # 'data' propositalmente omitido
             }
             return redirect('cadastro_agenda')
@@ -249,23 +489,17 @@ def editar_agenda(request, pk):
 
         form = AgendaForm(request.POST, instance=agenda)
         if form.is_valid():
-            nome = form.cleaned_data['nome']
-            telefone = form.cleaned_data['telefone']
-            area = form.cleaned_data['area']
-
-            cliente = agenda.cliente
-            cliente.nome = nome
-            cliente.telefone = telefone
-            cliente.area = area
-            cliente.save()
-
-            agenda = form.save(commit=False)
-            agenda.cliente = cliente
-            agenda.save()
-
-            Painel.objects.get_or_create(agenda=agenda)
-
-            return redirect('painel_presenca')
+            try:
+                servicos.atualizar_agenda(
+                    form.save(commit=False),
+                    form.cleaned_data['nome'],
+                    form.cleaned_data['telefone'],
+                    form.cleaned_data['area'],
+                )
+            except servicos.ConflitoHorario as e:
+                form.add_error(None, str(e))
+            else:
+                return redirect('painel_presenca')
     else:
         initial = {
             'nome': agenda.cliente.nome,
@@ -277,6 +511,28 @@ def editar_agenda(request, pk):
     return render(request, 'agenda.html', {'form': form, 'agenda': agenda})
 
 
+def _periodo_relatorio(request):
+    """?mes=AAAA-MM ou ?inicio=&fim=; None quando o pedido é de um único dia."""
+    mes_str = request.GET.get('mes')
+    inicio_str = request.GET.get('inicio')
+    fim_str = request.GET.get('fim')
+    try:
+        if mes_str:
+            inicio = date.fromisoformat(f"{mes_str}-01")
+            fim = (inicio + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+        elif inicio_str and fim_str:
+            inicio = date.fromisoformat(inicio_str)
+            fim = date.fromisoformat(fim_str)
+        else:
+            return None
+    except ValueError:
+        return None
+    if fim < inicio or (fim - inicio).days > MAX_DIAS_EXPORTACAO:
+        return None
+    return inicio, fim
+
+
+@orcamento_consultas(3)
 def relatorio_presenca(request):
     data_str = request.GET.get('data')
     try:
@@ -284,59 +540,132 @@ def relatorio_presenca(request):
     except (ValueError, TypeError):
         data_obj = date.today()
 
-    # Carrega agendas com cliente e painel em uma única consulta
-    agendas = (
-        Agenda.objects
-        .filter(data=data_obj)
-        .select_related('cliente')
-    )
-    paineis = (
-        Painel.objects
-        .filter(agenda__in=agendas)
-        .select_related('agenda__cliente')
-    )
-
-    # Pré-processa os dados
-    total_presentes = total_faltantes = lucro_total = 0
-    nomes_presentes = []
-    nomes_faltantes = []
-
-    for painel in paineis:
-        cliente_nome = painel.agenda.cliente.nome
-        valor = painel.agenda.valor or 0
-
-        if painel.presenca:
-            total_presentes += 1
-            lucro_total += valor
-            nomes_presentes.append(cliente_nome)
-        else:
-            total_faltantes += 1
-            nomes_faltantes.append(cliente_nome)
-
     contexto = {
         'data_selecionada': data_obj,
-        'total_presentes': total_presentes,
-        'total_faltantes': total_faltantes,
-        'lucro_total': lucro_total,
-        'nomes_presentes': nomes_presentes,
-        'nomes_faltantes': nomes_faltantes,
+        'agrupamentos': AGRUPAMENTOS_RELATORIO,
     }
 
+    periodo = _periodo_relatorio(request)
+    if periodo:
+        # Resumo de vários dias: uma linha por grupo, calculada no banco
+        inicio, fim = periodo
+        agrupar = request.GET.get('agrupar')
+        if agrupar not in relatorios.AGRUPAMENTOS:
+            agrupar = 'dia'
+        linhas = relatorios.resumo_periodo(inicio, fim, agrupar)
+        totais = relatorios.somar(linhas)
+        contexto.update({
+            'periodo': True,
+            'inicio': inicio,
+            'fim': fim,
+            'agrupar': agrupar,
+            'linhas': linhas,
+            'total_presentes': totais['presentes'],
+            'total_faltantes': totais['faltantes'],
+            'lucro_total': totais['lucro_total'],
+        })
+    else:
+        resumo = relatorios.resumo_dia(data_obj)
+        contexto.update({
+            'total_presentes': resumo['presentes'],
+            'total_faltantes': resumo['faltantes'],
+            'lucro_total': resumo['lucro_total'],
+            'nomes_presentes': resumo['nomes_presentes'],
+            'nomes_faltantes': resumo['nomes_faltantes'],
+        })
+
     return render(request, 'relatorio_presenca.html', contexto)
 
+def _perfil_cliente(request, pk):
+    """Cliente (com o saldo do pacote atual), resumo e uma página do histórico."""
+    cliente = get_object_or_404(
+        pacotes.anotar_saldo(Cliente.objects.only('id', 'nome', 'telefone', 'area')), pk=pk,
+    )
+    antes = request.GET.get('antes') or None
+    try:
+        linhas, proxima = historico.historico_cliente(pk, antes)
+    except historico.CursorInvalido:
+        return None
+    return {
+        'cliente': cliente,
+        'pacote': pacotes.descrever_saldo(cliente.pacote_total, cliente.pacote_restantes),
+        'resumo': historico.resumo_cliente(pk),
+        'historico': linhas,
+        'primeira_pagina': not antes,
+        'proxima': proxima,
+    }
+
+
+@orcamento_consultas(3)
+def perfil_cliente(request, pk):
+    contexto = _perfil_cliente(request, pk)
+    if contexto is None:
+        return HttpResponseBadRequest("Cursor inválido")
+    return render(request, 'perfil_cliente.html', contexto)
+
+
+@orcamento_consultas(3)
+def perfil_cliente_api(request, pk):
+    contexto = _perfil_cliente(request, pk)
+    if contexto is None:
+        return JsonResponse({'erro': 'Cursor inválido'}, status=400)
+    cliente = contexto['cliente']
+    return JsonResponse({
+        'cliente': {'id': cliente.id, 'nome': cliente.nome, 'telefone': cliente.telefone, 'area': cliente.area},
+        'pacote': contexto['pacote'],
+        'resumo': contexto['resumo'],
+        'historico': contexto['historico'],
+        'proxima': contexto['proxima'],
+    })
+
+
 def gerar_codigo():
     return uuid.uuid4().hex[:10]
 
+def _links_paginados(request):
+    """
+    Página de links por keyset: ?apos=<id> traz os links com id menor que o
+    último exibido, então o custo não cresce com o número de páginas.
+    """
+    busca = request.GET.get('busca', '').strip()
+    arquivados = request.GET.get('arquivados') == '1'
+    try:
+        apos = int(request.GET.get('apos', ''))
+    except ValueError:
+        apos = None
+
+    consulta = (
+        ClienteLink.objects
+        .filter(arquivado=arquivados)
+        .select_related('cliente')
+        .only('id', 'codigo', 'link_completo', 'criado_em', 'expira_em', 'arquivado', 'cliente__nome')
+        .order_by('-id')
+    )
+    if busca:
+        consulta = consulta.filter(cliente__nome_normalizado__contains=normalizar_nome(busca))
+    if apos:
+        consulta = consulta.filter(id__lt=apos)
+
+    pagina = list(consulta[:LINKS_POR_PAGINA + 1])
+    proxima = pagina[LINKS_POR_PAGINA - 1].id if len(pagina) > LINKS_POR_PAGINA else None
+    return {
+        'links': pagina[:LINKS_POR_PAGINA],
+        'busca': busca,
+        'arquivados': arquivados,
+        'primeira_pagina': not apos,
+        'proxima': proxima,
+    }
+
+
+@orcamento_consultas(4)
 def asscontrato(request):
-    links = ClienteLink.objects.all()
-    form = ClienteForm(request.GET or None)
+    form = ClienteForm(request.GET if 'nome' in request.GET else None)
     cliente_selecionado = None
     link_gerado = None
     link_completo = None  # <--- adicionar
 
     if form.is_valid():
-        cliente_id = form.cleaned_data['nome']
-        cliente = Cliente.objects.get(id=cliente_id)
+        cliente = form.cleaned_data['nome']
         cliente_selecionado = cliente.nome
 
         # ==== Criação do link único ====
@@ -349,12 +678,19 @@ def asscontrato(request):
         # URL completa (funciona no DEV e PRODUÇÃO)
         link_completo = request.build_absolute_uri(url)
 
-        # Salva no banco
-        ClienteLink.objects.create(
-            cliente=cliente,
-            codigo=codigo,
-            link_completo=link_completo  # <--- salvar COMPLETA agora
-        )
+        validade = settings.LINK_VALIDADE_DIAS
+        if settings.LINKS_ASSINADOS:
+            # Link assinado: nada é gravado, a validação é feita ao abrir
+            url = reverse('link_assinado', args=[nome_slug or 'cliente', links.gerar_token(cliente, validade)])
+            link_completo = request.build_absolute_uri(url)
+        else:
+            # Salva no banco
+            ClienteLink.objects.create(
+                cliente=cliente,
+                codigo=codigo,
+                link_completo=link_completo,  # <--- salvar COMPLETA agora
+                expira_em=timezone.now() + timedelta(days=validade) if validade else None,
+            )
 
         link_gerado = url
 
@@ -363,7 +699,7 @@ def asscontrato(request):
         "cliente_selecionado": cliente_selecionado,
         "link_gerado": link_gerado,
         "link_completo": link_completo,  # <---
-        "links": links,
+        **_links_paginados(request),
     }
     return render(request, 'contrato.html', context)
 
@@ -373,13 +709,92 @@ def excluir_link(request, pk):
     link.delete()
     return redirect("asscontrato")  # voltar para a página principal
 
-def mensagem_view(request, nome, codigo):
+def arquivar_link(request, pk):
+    ClienteLink.objects.filter(pk=pk).update(arquivado=True)
+    return redirect("asscontrato")
 
+@require_http_methods(["POST"])
+def revogar_link(request):
+    """Revoga um link assinado colado no formulário (ou apenas o token)."""
+    partes = [parte for parte in request.POST.get('link', '').strip().split('/') if parte]
+    try:
+        dados = links.revogar(partes[-1] if partes else '')
+    except links.LinkInvalido:
+        messages.error(request, "Link assinado inválido: confira o endereço colado.")
+    else:
+        messages.success(request, f"Link revogado (cliente #{dados['c']}).")
+    return redirect("asscontrato")
+
+def _assinar(request, cliente, **origem):
+    """
+    Trata o POST da página de assinatura (link salvo ou assinado) e
+    redireciona para a página do contrato assinado: recarregar não assina de novo.
+    """
     try:
-        link = ClienteLink.objects.get(codigo=codigo)
+        assinatura = assinaturas.registrar(
+            cliente, request.POST.get('imagem', ''), ip=request.META.get('REMOTE_ADDR'), **origem
+        )
+    except assinaturas.AssinaturaInvalida as e:
+        return render(request, "assinatura.html", {"cliente": cliente, "erro": str(e)}, status=400)
+    except assinaturas.ContratoJaAssinado as e:
+        messages.info(request, str(e))
+        assinatura = e.assinatura
+    return redirect("contrato_assinado", token=assinatura.token)
+
+@orcamento_consultas(3)
+@require_http_methods(["GET", "POST"])
+async def link_assinado(request, nome, token):
+    # Sem consultas no caminho comum: assinatura verificada aqui e cliente em cache
+    try:
+        cliente = await links.acliente_do_link(token)
+    except links.LinkExpirado:
+        return HttpResponse("Link expirado!", status=410)
+    except links.LinkInvalido:
+        return HttpResponse("Link inválido!")
+
+    if request.method == "POST":
+        cliente = await aget_object_or_404(Cliente, pk=cliente['id'])
+        return await sync_to_async(_assinar)(request, cliente, nonce=links.ler_token(token)['n'])
+
+    # render numa thread: as mensagens podem cair no storage de sessão (banco)
+    return await sync_to_async(render)(request, "assinatura.html", {"cliente": cliente})
+
+@orcamento_consultas(4)
+@require_http_methods(["GET", "POST"])
+async def mensagem_view(request, nome, codigo):
+
+    try:
+        link = await ClienteLink.objects.select_related('cliente').aget(codigo=codigo)
         cliente = link.cliente
     except ClienteLink.DoesNotExist:
         return HttpResponse("Link inválido!")
 
-    return render(request, "assinatura.html", {"cliente": cliente})
+    if link.arquivado or link.expirado:
+        return HttpResponse("Link expirado!", status=410)
+
+    if request.method == "POST":
+        return await sync_to_async(_assinar)(request, cliente, link=link)
+
+    return await sync_to_async(render)(request, "assinatura.html", {"cliente": cliente})
+
+def contrato_assinado(request, token):
+    assinatura = assinaturas.assinatura_do_token(token)
+    if assinatura is None:
+        raise Http404("Contrato não encontrado.")
+    return render(request, "assinatura.html", {"cliente": assinatura.cliente, "assinatura": assinatura})
 
+def contrato_assinado_pdf(request, token):
+    assinatura = assinaturas.assinatura_do_token(token)
+    if assinatura is None:
+        raise Http404("Contrato não encontrado.")
+    try:
+        arquivo = assinatura.contrato.open('rb')
+    except (OSError, ValueError):
+        # Sem arquivo (perdido antes da migração para o storage) ou apagado dele
+        raise Http404("Arquivo do contrato não encontrado.")
+    return FileResponse(
+        arquivo,
+        as_attachment=True,
+        filename=f"contrato_{slugify(assinatura.cliente.nome)}.pdf",
+        content_type='application/pdf',
+    )